@@ -0,0 +1,124 @@
+"""Extraction time and peak memory over large HTML pages.
+
+Runs extract.parse the way fetch_page does, feeding 64 KB chunks, with
+the default character budget and with no budget. Pass a directory of
+saved .html pages; without one, a few multi-MB pages are generated into
+a temporary directory. When BeautifulSoup is installed, the previous
+html.parser + find_all extractor is measured as well.
+
+    python3 benchmarks/html_extract.py [pages_dir]
+"""
+import os
+import re
+import sys
+import glob
+import time
+import random
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import extract
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+WORDS = "the quick brown fox jumps over lazy dog documentation request response value".split()
+
+
+def sentence(rng, words=20):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_page(path, size, seed):
+    rng = random.Random(seed)
+    parts = ["<html><head><title>page</title><style>body { margin: 0 }</style></head><body>",
+             "<nav>" + "".join(f"<a href='/nav/{index}'>nav {index}</a>" for index in range(200)) + "</nav>"]
+    length = sum(map(len, parts))
+    index = 0
+    while length < size:
+        block = rng.choice((
+            f"<h2>{sentence(rng, 5)}</h2>",
+            f"<p>{sentence(rng, 60)} <a href='/page/{index}'>{sentence(rng, 3)}</a> {sentence(rng, 30)}</p>",
+            "<ul>" + "".join(f"<li>{sentence(rng, 8)}" for _ in range(10)) + "</ul>",
+            f"<div class='row'><span>{sentence(rng, 10)}</span><script>var x = {index};</script></div>",
+            f"<table><tr><td>{sentence(rng, 4)}</td><td>{index}</td></tr></table>",
+        ))
+        parts.append(block)
+        length += len(block)
+        index += 1
+    parts.append("<footer>footer</footer></body></html>")
+    with open(path, "w") as file:
+        file.write("".join(parts))
+
+
+def read_chunks(path, chunk_size=65536):
+    with open(path, encoding="utf-8", errors="replace") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def extract_streaming(path, max_chars):
+    pieces = read_chunks(path)
+    try:
+        return extract.parse(pieces, "http://example.com/", max_chars)
+    finally:
+        pieces.close()
+
+
+def extract_soup(path, max_chars):
+    with open(path, encoding="utf-8", errors="replace") as file:
+        soup = BeautifulSoup(file.read(), "html.parser")
+    for tag in soup(["script", "style", "nav", "header", "footer", "aside"]):
+        tag.decompose()
+    content = []
+    for element in soup.find_all(["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "a"]):
+        content.append(element.get_text(strip=True))
+    result = re.sub(r"\s+", " ", re.sub(r"\n\s*\n", "\n\n", "\n\n".join(content)))
+    return result[:max_chars]
+
+
+def measure(function, path, max_chars):
+    start = time.perf_counter()
+    text = function(path, max_chars)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(path, max_chars)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, len(text)
+
+
+def run(paths):
+    runs = [("stream 20k", extract_streaming, 20000), ("stream all", extract_streaming, sys.maxsize)]
+    if BeautifulSoup is not None:
+        runs.append(("soup all", extract_soup, sys.maxsize))
+
+    print(f"parser backend: {'lxml' if extract.etree is not None else 'html.parser'}")
+    for path in paths:
+        size = os.path.getsize(path) / 1024 / 1024
+        for name, function, max_chars in runs:
+            elapsed, peak, length = measure(function, path, max_chars)
+            print(f"{os.path.basename(path):24} {size:6.1f} MB  {name:10} "
+                  f"{elapsed * 1000:9.1f} ms  peak {peak / 1024 / 1024:7.1f} MB  text {length:9d} chars")
+
+
+def main():
+    if len(sys.argv) > 1:
+        run(sorted(glob.glob(os.path.join(sys.argv[1], "*.html"))))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="wienere-pages-") as directory:
+        paths = []
+        for index, size in enumerate((1, 4, 10)):
+            path = os.path.join(directory, f"page-{size}mb.html")
+            generate_page(path, size * 1024 * 1024, index)
+            paths.append(path)
+        run(paths)
+
+if __name__ == "__main__":
+    main()
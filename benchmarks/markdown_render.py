@@ -0,0 +1,87 @@
+"""Per-chunk render cost of MarkdownView while a 50 KB answer streams in.
+
+"incremental" appends each chunk with append_markdown, as streamed chat
+replies do. "full" re-renders the whole text into a fresh view, which
+is what every update cost before the incremental renderer; it is only
+sampled every tenth chunk to keep the run short. The mean cost per
+chunk is printed for each tenth of the answer, so a flat incremental
+column and a growing full column are the expected shape.
+
+Needs GTK 4 with a display and the app's Python dependencies.
+
+    python3 benchmarks/markdown_render.py [size_kb] [chunk_chars]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk
+
+from src import tools
+
+
+def generate_answer(size, seed=0):
+    rng = random.Random(seed)
+    words = "render block widget stream markdown chunk label list code table answer".split()
+    parts = []
+    length = 0
+    index = 0
+    while length < size:
+        kind = index % 5
+        if kind == 0:
+            part = f"## Section {index}\n\n"
+        elif kind == 1:
+            part = " ".join(rng.choice(words) for _ in range(80)) + " **bold** and `code`.\n\n"
+        elif kind == 2:
+            part = "".join(f"- item {item}: {' '.join(rng.choice(words) for _ in range(8))}\n" for item in range(6)) + "\n"
+        elif kind == 3:
+            part = "```python\n" + "".join(f"value_{line} = {line} * 2\n" for line in range(10)) + "```\n\n"
+        else:
+            part = "| a | b |\n|---|---|\n" + "".join(f"| {row} | {row * 2} |\n" for row in range(5)) + "\n"
+        parts.append(part)
+        length += len(part)
+        index += 1
+    return "".join(parts)[:size]
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 if len(sys.argv) > 1 else 50 * 1024
+    chunk_chars = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    Gtk.init()
+
+    answer = generate_answer(size)
+    chunks = [answer[start:start + chunk_chars] for start in range(0, len(answer), chunk_chars)]
+    buckets = 10
+    incremental = [[] for _ in range(buckets)]
+    full = [[] for _ in range(buckets)]
+
+    view = tools.MarkdownView()
+    text = ""
+    for index, chunk in enumerate(chunks):
+        bucket = index * buckets // len(chunks)
+        text += chunk
+
+        start = time.perf_counter()
+        view.append_markdown(chunk)
+        incremental[bucket].append(time.perf_counter() - start)
+
+        if index % 10 == 0:
+            start = time.perf_counter()
+            tools.MarkdownView(text)
+            full[bucket].append(time.perf_counter() - start)
+
+    print(f"{len(answer)} chars in {len(chunks)} chunks of {chunk_chars}")
+    print(f"{'answer so far':>14} {'incremental ms':>15} {'full ms':>10}")
+    for bucket in range(buckets):
+        mean_incremental = sum(incremental[bucket]) / max(len(incremental[bucket]), 1) * 1000
+        mean_full = sum(full[bucket]) / max(len(full[bucket]), 1) * 1000
+        print(f"{(bucket + 1) * 100 // buckets:>13}% {mean_incremental:>15.3f} {mean_full:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
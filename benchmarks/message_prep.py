@@ -0,0 +1,113 @@
+"""Per-request message preparation cost for long tool-chat histories.
+
+"after" drives the shipping code: a ToolChatManager whose history was
+filled through serialize_message and the real finish_tool_calls (with
+stub tool widgets), timed on get_request_params.
+"before" is the pre-change ToolChatManager.get_messages, kept here as
+the baseline: tool results were re-created from their widgets with
+str(widget) and the assistant ChatCompletionMessage objects were dumped
+again for every request. Encoding the payload to JSON is reported
+separately because both paths pay it.
+
+Needs the app's dependencies (GTK 4, openai).
+
+    python3 benchmarks/message_prep.py [turns]
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from openai.types.chat import ChatCompletionMessage
+
+from src import control, managers
+
+
+class ToolWidget:
+    def __init__(self, output):
+        self.result = output
+
+    def __str__(self):
+        return self.result
+
+
+def build_history(turns, output_size=4096):
+    history = [{"role": "system", "content": "You are a helpful assistant."}]
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"Step {turn}: run the analysis again"})
+        history.append(ChatCompletionMessage(
+            role="assistant",
+            content=None,
+            tool_calls=[{
+                "id": f"call_{turn}",
+                "type": "function",
+                "function": {"name": "python", "arguments": json.dumps({"code": "print(1)" * 20})},
+            }],
+        ))
+        history.append({
+            "tool_call_id": f"call_{turn}",
+            "role": "tool",
+            "name": "python",
+            "widget": ToolWidget("x" * output_size),
+        })
+        history.append(ChatCompletionMessage(role="assistant", content=f"Result of step {turn}"))
+    return history
+
+
+def prepare_before(history):
+    messages = [message if not isinstance(message, dict) or "widget" not in message else
+                {key if key != "widget" else "content": str(value) for key, value in message.items()}
+                for message in history]
+    return [managers.serialize_message(message) for message in messages]
+
+
+def create_manager(history):
+    manager = managers.ToolChatManager.__new__(managers.ToolChatManager)
+    manager.MODEL = "benchmark"
+    manager.lock = threading.Lock()
+    manager.tools = []
+    manager.tool_schemas = None
+    manager.turn_context = []
+    manager.messages = []
+    manager.execution_control = control.ExecutionControl()
+    manager.process_message = lambda exec_id: None
+    exec_id = manager.execution_control.start_new()
+    for message in history:
+        if isinstance(message, dict) and "widget" in message:
+            manager.finish_tool_calls([dict(message)], exec_id)
+        else:
+            manager.messages.append(managers.serialize_message(message))
+    return manager
+
+
+def measure(function, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        messages = function()
+    prepare = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.dumps(messages)
+    encode = (time.perf_counter() - start) / repeat
+    return prepare, encode
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    history = build_history(turns)
+    manager = create_manager(history)
+    print(f"{turns} turns, {len(history)} messages")
+    for name, function in (
+        ("before", lambda: prepare_before(history)),
+        ("after", lambda: manager.get_request_params()["messages"]),
+    ):
+        prepare, encode = measure(function)
+        print(f"{name:7} prepare {prepare * 1000:8.3f} ms  encode {encode * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
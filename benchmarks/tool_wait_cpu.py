@@ -0,0 +1,63 @@
+"""CPU time spent while a chat waits on a long tool call.
+
+Compares the old busy-wait (`while thread.is_alive(): pass`) with the
+current path: the tool runs on the tool executor and the request engine
+awaits it while ExecutionControl tracks the task.
+
+    python3 benchmarks/tool_wait_cpu.py [seconds]
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import control, engine
+
+
+def tool_call(seconds):
+    time.sleep(seconds)
+
+
+def busy_wait(seconds):
+    thread = threading.Thread(target=tool_call, args=(seconds,), daemon=True)
+    thread.start()
+    while thread.is_alive():
+        pass
+
+
+def engine_wait(seconds):
+    executor = ThreadPoolExecutor(max_workers=1)
+    execution_control = control.ExecutionControl()
+    exec_id = execution_control.start_new()
+
+    async def run_widget():
+        await asyncio.get_running_loop().run_in_executor(executor, tool_call, seconds)
+
+    done = threading.Event()
+    task = execution_control.track(exec_id, engine.submit(run_widget()))
+    task.add_done_callback(lambda task: done.set())
+    done.wait()
+    executor.shutdown()
+
+
+def measure(wait, seconds):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    wait(seconds)
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    engine.get_engine()
+    for name, wait in (("busy-wait", busy_wait), ("engine", engine_wait)):
+        cpu, wall = measure(wait, seconds)
+        print(f"{name:10} cpu {cpu:7.3f}s  wall {wall:7.3f}s  ({cpu / wall:6.1%} of one core)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import time
+import sqlite3
+import threading
+
+
+class DiskCache:
+    def __init__(self, path, ttl=7 * 24 * 3600, max_size=100 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, "
+                "value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "created REAL NOT NULL, "
+                "accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        now = time.time()
+        with self.lock, self.connect() as connection:
+            row = connection.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self.lock, self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            connection.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_size:
+                rows = connection.execute("SELECT key, size FROM entries ORDER BY accessed")
+                evicted = []
+                for evicted_key, size in rows:
+                    if total <= self.max_size:
+                        break
+                    evicted.append((evicted_key,))
+                    total -= size
+                connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def get_hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
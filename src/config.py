@@ -1,20 +1,43 @@
-from gi.repository import Gtk, Gio, Adw, GLib
+from gi.repository import Gtk, Gio, Adw, GLib, GObject
 import json
 import os
+import tempfile
+import threading
 
 CONFIG_FILE =  os.path.join(GLib.get_user_config_dir(), 'config.json')
+SAVE_DELAY = 500
+RELOAD_DELAY = 200
 
 
 
-class ConfigManager:
+class ConfigManager(GObject.Object):
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, (str, str))
+    }
+
     def __init__(self):
+        super().__init__()
 
         self.config = {"models": {}, "tools": {}, "chats": {}}
+        self.save_source = None
+        self.reload_source = None
 
         self.load_config()
-        self.models = self.config["models"]
-        self.tools = self.config["tools"]
-        self.chats = self.config["chats"]
+
+        self.monitor = Gio.File.new_for_path(CONFIG_FILE).monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        self.monitor.connect("changed", self.on_file_changed)
+
+    @property
+    def models(self):
+        return self.config["models"]
+
+    @property
+    def tools(self):
+        return self.config["tools"]
+
+    @property
+    def chats(self):
+        return self.config["chats"]
 
     def load_config(self):
         if os.path.exists(CONFIG_FILE):
@@ -23,23 +46,79 @@ class ConfigManager:
         else:
             self.save_config()
 
+    def on_file_changed(self, monitor, file, other_file, event_type):
+        if event_type not in (Gio.FileMonitorEvent.CHANGES_DONE_HINT, Gio.FileMonitorEvent.CREATED,
+                              Gio.FileMonitorEvent.MOVED_IN, Gio.FileMonitorEvent.RENAMED):
+            return
+        if self.reload_source is None:
+            self.reload_source = GLib.timeout_add(RELOAD_DELAY, self.on_reload_timeout)
+
+    def on_reload_timeout(self):
+        self.reload_source = None
+        if self.save_source is None:
+            self.reload_config()
+        return False
+
+    def reload_config(self):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                new_config = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        old_config = self.config
+        self.config = new_config
+        for category in ("models", "tools", "chats"):
+            old_items = old_config.get(category, {})
+            new_items = new_config.setdefault(category, {})
+            for name in old_items.keys() | new_items.keys():
+                if old_items.get(name) != new_items.get(name):
+                    self.emit("changed", category, name)
+
     def save_config(self):
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        if self.save_source is None:
+            self.save_source = GLib.timeout_add(SAVE_DELAY, self.on_save_timeout)
+
+    def on_save_timeout(self):
+        self.save_source = None
+        self.write_config()
+        return False
+
+    def flush(self):
+        if self.save_source is not None:
+            GLib.source_remove(self.save_source)
+            self.save_source = None
+            self.write_config()
+
+    def write_config(self):
+        data = json.dumps(self.config, indent=2)
+        fd, path = tempfile.mkstemp(dir=os.path.dirname(CONFIG_FILE), prefix=".config-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path, CONFIG_FILE)
+        except OSError:
+            os.unlink(path)
+            raise
 
     def add_item(self, category, name, data):
         self.config[category][name] = data
         self.save_config()
+        self.emit("changed", category, name)
 
     def update_item(self, category, name, data):
         if name in self.config[category]:
             self.config[category][name] = data
             self.save_config()
+            self.emit("changed", category, name)
 
     def remove_item(self, category, name):
         if name in self.config[category]:
             del self.config[category][name]
             self.save_config()
+            self.emit("changed", category, name)
 
     def get_item(self, category, name):
         return self.config[category].get(name)
@@ -47,6 +126,27 @@ class ConfigManager:
     def get_all_items(self, category):
         return self.config[category]
 
+
+config_manager = None
+config_manager_lock = threading.Lock()
+
+
+def get_config_manager():
+    global config_manager
+    with config_manager_lock:
+        if config_manager is None:
+            config_manager = ConfigManager()
+        return config_manager
+
+
+def parse_number(value, default, kind=int):
+    if value is None or value == "":
+        return default
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return default
+
 class ConfigWindow(Adw.PreferencesWindow):
     def __init__(self, win, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -55,7 +155,10 @@ class ConfigWindow(Adw.PreferencesWindow):
 
         self.win = win
 
-        self.config_manager = ConfigManager()
+        self.config_manager = get_config_manager()
+        self.groups = {}
+        self.add_buttons = {}
+        self.rows = {}
 
         self.set_title(_("Configuration Manager"))
         self.set_default_size(360, 500)
@@ -85,11 +188,32 @@ class ConfigWindow(Adw.PreferencesWindow):
         view_switcher_title.connect("notify::title-visible",
                                     lambda _, __: switcher.set_reveal(view_switcher_title.get_title_visible()))
         self.connect("close-request", self.on_window_close)
+        self.changed_handler = self.config_manager.connect("changed", self.on_config_changed)
 
     def on_window_close(self, *args):
+        if self.changed_handler:
+            self.config_manager.disconnect(self.changed_handler)
+            self.changed_handler = None
         self.win.update_config()
         self.close()
 
+    def on_config_changed(self, manager, category, name):
+        data = self.config_manager.get_item(category, name)
+        row = self.rows[category].get(name)
+        if data is None:
+            if row:
+                self.groups[category].remove(row)
+                del self.rows[category][name]
+        elif row:
+            row.set_subtitle(data.get('type', ''))
+        else:
+            group = self.groups[category]
+            add_button = self.add_buttons[category]
+            group.remove(add_button)
+            self.rows[category][name] = self.create_config_row(name, data, category)
+            group.add(self.rows[category][name])
+            group.add(add_button)
+
 
     def show_stacks(self):
         self.create_config_page("Models", "models", "system-run-symbolic")
@@ -103,16 +227,20 @@ class ConfigWindow(Adw.PreferencesWindow):
 
         group = Adw.PreferencesGroup()
         page.add(group)
+        self.groups[category] = group
+        self.rows[category] = {}
 
         for name, data in self.config_manager.get_all_items(category).items():
             row = self.create_config_row(name, data, category)
             group.add(row)
+            self.rows[category][name] = row
 
         add_button = Gtk.Button(label=f"Add {title.rstrip('s')}")
         add_button.connect("clicked", self.on_add_item_clicked, category)
         add_button.add_css_class("suggested-action")
         add_button.set_margin_top(12)
         group.add(add_button)
+        self.add_buttons[category] = add_button
 
     def create_config_row(self, name, data, category):
         row = Adw.ActionRow(title=name, subtitle=data.get('type', ''))
@@ -170,7 +298,7 @@ class ConfigWindow(Adw.PreferencesWindow):
 
         dialog.type_combo = Adw.ComboRow(title=_("Type"))
         if category == "tools":
-            types=["python", "memory", "urlTextExtractor", "runSimpleChat", "thinking"]
+            types=["python", "memory", "memoryRecall", "urlTextExtractor", "urlCrawler", "runSimpleChat", "thinking"]
 
         else:
             types=["tool", "simple", "vision"]
@@ -189,6 +317,15 @@ class ConfigWindow(Adw.PreferencesWindow):
             dialog.model_entry = Adw.EntryRow(title=_("Model"))
             group.add(dialog.model_entry)
 
+            dialog.max_connections_entry = Adw.EntryRow(title=_("Max Connections"))
+            group.add(dialog.max_connections_entry)
+
+            dialog.timeout_entry = Adw.EntryRow(title=_("Timeout (seconds)"))
+            group.add(dialog.timeout_entry)
+
+            dialog.context_tokens_entry = Adw.EntryRow(title=_("Context Tokens"))
+            group.add(dialog.context_tokens_entry)
+
         if category == "tools":
             dialog.descriptions = {}
             for tool_name, tool_object in tools.tools.items():
@@ -213,6 +350,16 @@ class ConfigWindow(Adw.PreferencesWindow):
 
             dialog.model_entry = Adw.EntryRow(title=_("Model"))
             group.add(dialog.model_entry)
+
+            dialog.summary_chat_entry = Adw.EntryRow(title=_("Summary Chat"))
+            group.add(dialog.summary_chat_entry)
+
+            dialog.stream_switch = Adw.SwitchRow(title=_("Stream Responses"))
+            dialog.stream_switch.set_active(True)
+            group.add(dialog.stream_switch)
+
+            dialog.response_cache_switch = Adw.SwitchRow(title=_("Cache Responses"))
+            group.add(dialog.response_cache_switch)
             dialog.type_combo.connect("notify::selected-item", self.on_type_combo_changed, dialog)
             self.on_type_combo_changed(dialog.type_combo, None, dialog)
 
@@ -224,6 +371,9 @@ class ConfigWindow(Adw.PreferencesWindow):
                 dialog.api_key_entry.set_text(item_data.get("api_key", ""))
                 dialog.base_url_entry.set_text(item_data.get("base_url", ""))
                 dialog.model_entry.set_text(item_data.get("MODEL", ""))
+                dialog.max_connections_entry.set_text(item_data.get("max_connections", ""))
+                dialog.timeout_entry.set_text(item_data.get("timeout", ""))
+                dialog.context_tokens_entry.set_text(item_data.get("context_tokens", ""))
             if category == "tools":
                 dialog.description_entry.set_text(item_data.get("description", ""))
                 for description_name, description_entry in dialog.descriptions.items():
@@ -232,6 +382,9 @@ class ConfigWindow(Adw.PreferencesWindow):
                 dialog.start_message_entry.set_text(item_data.get("start_message", ""))
                 dialog.tools_entry.set_text(", ".join(item_data.get("tools", [])))
                 dialog.model_entry.set_text(item_data.get("model", ""))
+                dialog.summary_chat_entry.set_text(item_data.get("summary_chat", ""))
+                dialog.stream_switch.set_active(item_data.get("stream", True))
+                dialog.response_cache_switch.set_active(item_data.get("response_cache", False))
 
 
 
@@ -253,6 +406,9 @@ class ConfigWindow(Adw.PreferencesWindow):
             item_data["api_key"] = dialog.api_key_entry.get_text()
             item_data["base_url"] = dialog.base_url_entry.get_text()
             item_data["MODEL"] = dialog.model_entry.get_text()
+            item_data["max_connections"] = dialog.max_connections_entry.get_text()
+            item_data["timeout"] = dialog.timeout_entry.get_text()
+            item_data["context_tokens"] = dialog.context_tokens_entry.get_text()
 
         if category == "tools":
             item_data["description"] = dialog.description_entry.get_text()
@@ -263,12 +419,14 @@ class ConfigWindow(Adw.PreferencesWindow):
             item_data["start_message"] = dialog.start_message_entry.get_text()
             item_data["tools"] = [tool.strip() for tool in dialog.tools_entry.get_text().split(',')]
             item_data["model"] = dialog.model_entry.get_text()
+            item_data["summary_chat"] = dialog.summary_chat_entry.get_text()
+            item_data["stream"] = dialog.stream_switch.get_active()
+            item_data["response_cache"] = dialog.response_cache_switch.get_active()
 
         if old_name and old_name != name:
             self.config_manager.remove_item(category, old_name)
 
         self.config_manager.add_item(category, name, item_data)
-        self.refresh_pages(category)
         dialog.close()
 
     def on_delete_item_clicked(self, button, category, name):
@@ -287,13 +445,3 @@ class ConfigWindow(Adw.PreferencesWindow):
     def on_delete_dialog_response(self, dialog, response, category, name):
         if response == "delete":
             self.config_manager.remove_item(category, name)
-            self.refresh_pages(category)
-
-    def refresh_pages(self,category):
-
-
-        while page := self.stack.get_first_child():
-            self.stack.remove(page)
-
-        self.show_stacks()
-        self.stack.set_visible_child_name(category)
@@ -0,0 +1,82 @@
+SUMMARY_PREFIX = "Summary of earlier conversation:\n"
+OMITTED_OUTPUT = "[Tool output omitted to save context]"
+
+
+def get_field(message, key):
+    if isinstance(message, dict):
+        return message.get(key)
+    return getattr(message, key, None)
+
+
+def get_text(message):
+    content = get_field(message, "content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return content or ""
+
+
+class ContextManager:
+    def __init__(self, budget, summarizer=None):
+        self.budget = budget
+        self.summarizer = summarizer
+        self.counts = {}
+
+    def count(self, message):
+        cached = self.counts.get(id(message))
+        if cached and cached[0] is message:
+            return cached[1]
+
+        tokens = 4 + len(get_text(message)) // 4
+        content = get_field(message, "content")
+        if isinstance(content, list):
+            tokens += 765 * sum(1 for part in content if part.get("type") == "image_url")
+        for tool_call in get_field(message, "tool_calls") or []:
+            tokens += 8 + len(get_field(get_field(tool_call, "function"), "arguments") or "") // 4
+
+        self.counts[id(message)] = (message, tokens)
+        return tokens
+
+    def total(self, messages):
+        return sum(self.count(message) for message in messages)
+
+    def compact(self, messages):
+        if not self.budget or self.total(messages) <= self.budget:
+            return messages
+
+        head = 0
+        while head < len(messages) and get_field(messages[head], "role") == "system":
+            head += 1
+        turns = []
+        for message in messages[head:]:
+            if not turns or get_field(message, "role") == "user":
+                turns.append([])
+            turns[-1].append(message)
+
+        for turn in turns[:-1]:
+            for index, message in enumerate(turn):
+                if get_field(message, "role") == "tool" and get_text(message) != OMITTED_OUTPUT:
+                    turn[index] = {
+                        "tool_call_id": message["tool_call_id"],
+                        "role": "tool",
+                        "name": message.get("name"),
+                        "content": OMITTED_OUTPUT,
+                    }
+        self.counts = {}
+
+        compacted = messages[:head] + [message for turn in turns for message in turn]
+        dropped = []
+        while len(turns) > 1 and self.total(compacted) > self.budget:
+            dropped.extend(turns.pop(0))
+            compacted = messages[:head] + [message for turn in turns for message in turn]
+
+        if dropped and self.summarizer:
+            summary = self.summarizer(dropped)
+            if summary:
+                compacted.insert(head, {"role": "user", "content": SUMMARY_PREFIX + summary})
+        return compacted
+
+    def transcript(self, messages):
+        return "\n\n".join(
+            f"{get_field(message, 'role')}: {get_text(message)[:2000]}"
+            for message in messages if get_text(message)
+        )
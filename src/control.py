@@ -5,11 +5,14 @@ class ExecutionControl:
     def __init__(self):
         self.lock = threading.Lock()
         self.current_id = None
+        self.tasks = set()
 
     def start_new(self):
         with self.lock:
             self.current_id = str(uuid.uuid4())
-            return self.current_id
+            tasks, self.tasks = self.tasks, set()
+        self.cancel(tasks)
+        return self.current_id
 
     def is_current(self, exec_id):
         with self.lock:
@@ -18,4 +21,24 @@ class ExecutionControl:
     def stop_all(self):
         with self.lock:
             self.current_id = None
+            tasks, self.tasks = self.tasks, set()
+        self.cancel(tasks)
 
+    def track(self, exec_id, task):
+        with self.lock:
+            current = exec_id == self.current_id
+            if current:
+                self.tasks.add(task)
+        if not current:
+            task.cancel()
+            return task
+        task.add_done_callback(self.untrack)
+        return task
+
+    def untrack(self, task):
+        with self.lock:
+            self.tasks.discard(task)
+
+    def cancel(self, tasks):
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+from gi.repository import GLib
+
+
+class RequestEngine:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="request-engine", daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+engine = None
+engine_lock = threading.Lock()
+
+
+def get_engine():
+    global engine
+    with engine_lock:
+        if engine is None:
+            engine = RequestEngine()
+        return engine
+
+
+def submit(coroutine):
+    return get_engine().submit(coroutine)
+
+
+async def run_on_main(function, *args):
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if not future.done():
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def run():
+        try:
+            result, error = function(*args), None
+        except Exception as e:
+            result, error = None, e
+        loop.call_soon_threadsafe(resolve, result, error)
+        return False
+
+    GLib.idle_add(run)
+    return await future
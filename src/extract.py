@@ -0,0 +1,232 @@
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li"}
+SKIP_TAGS = {"script", "style", "nav", "header", "footer", "aside", "noscript", "template"}
+CONTAINER_TAGS = {
+    "address", "article", "aside", "blockquote", "details", "dialog", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "header", "hgroup", "hr", "main", "menu", "nav", "ol", "pre",
+    "section", "table", "tbody", "td", "th", "thead", "tr", "ul",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class TextCollector:
+    def __init__(self, base_url, max_chars, callback=None):
+        self.base_url = base_url
+        self.max_chars = max_chars
+        self.callback = callback
+        self.blocks = []
+        self.size = 0
+        self.buffer = []
+        self.stack = []
+        self.links = []
+        self.depth = 0
+        self.skip = 0
+        self.full = False
+
+    def start(self, tag, attrs):
+        tag = tag.lower()
+        if tag in VOID_TAGS:
+            return
+        if (tag in BLOCK_TAGS or tag in CONTAINER_TAGS) and "p" in self.stack:
+            index = len(self.stack) - self.stack[::-1].index("p") - 1
+            if not CONTAINER_TAGS & set(self.stack[index:]) and not BLOCK_TAGS & set(self.stack[index + 1:]):
+                self.end("p")
+        if tag == "li" and "li" in self.stack:
+            index = len(self.stack) - self.stack[::-1].index("li") - 1
+            if not {"ul", "ol"} & set(self.stack[index:]):
+                self.end("li")
+
+        self.stack.append(tag)
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        elif self.skip:
+            return
+        elif tag in BLOCK_TAGS:
+            self.flush()
+            self.depth += 1
+        elif tag == "a":
+            self.links.append(attrs.get("href"))
+            self.depth += 1
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag not in self.stack:
+            return
+        while self.stack:
+            current = self.stack.pop()
+            self.leave(current)
+            if current == tag:
+                break
+
+    def leave(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip -= 1
+        elif self.skip:
+            return
+        elif tag == "a":
+            href = self.links.pop()
+            if href and self.buffer:
+                self.buffer.append(f" [{urljoin(self.base_url, href)}] ")
+            self.close_element()
+        elif tag in BLOCK_TAGS:
+            self.flush()
+            self.close_element()
+
+    def data(self, text):
+        if self.depth and not self.skip and not self.full:
+            self.buffer.append(text)
+
+    def close(self):
+        while self.stack:
+            self.leave(self.stack.pop())
+        self.flush()
+
+    def close_element(self):
+        self.depth -= 1
+        if not self.depth:
+            self.flush()
+
+    def flush(self):
+        text = " ".join("".join(self.buffer).split())
+        self.buffer = []
+        if not text or self.full:
+            return
+        text = text[:self.max_chars - self.size]
+        self.blocks.append(text)
+        self.size += len(text) + 2
+        if self.callback:
+            self.callback(text)
+        if self.size >= self.max_chars:
+            self.full = True
+
+    def get_text(self):
+        return "\n\n".join(self.blocks)
+
+
+class LinkCollector:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.links = []
+
+    def start(self, tag, attrs):
+        if tag.lower() == "a" and attrs.get("href"):
+            self.links.append(urljoin(self.base_url, attrs["href"]))
+
+    def end(self, tag):
+        pass
+
+    def data(self, text):
+        pass
+
+    def close(self):
+        pass
+
+
+class StdlibParser(HTMLParser):
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self):
+        super().close()
+        self.target.close()
+
+
+def get_parser(target):
+    if etree is not None:
+        return etree.HTMLParser(target=target, remove_comments=True)
+    return StdlibParser(target)
+
+
+def get_encoding(response):
+    if "charset" in response.headers.get("content-type", "").lower():
+        return response.encoding
+    return "utf-8"
+
+
+def parse(pieces, base_url, max_chars=20000, callback=None):
+    collector = TextCollector(base_url, max_chars, callback)
+    parser = get_parser(collector)
+    fed = False
+    for piece in pieces:
+        if piece:
+            parser.feed(piece)
+            fed = True
+        if collector.full:
+            break
+    else:
+        if fed:
+            parser.close()
+    collector.close()
+    return collector.get_text()
+
+
+def read_response(response, max_bytes, chunk_size=65536, raw=None):
+    decoder = codecs.getincrementaldecoder(get_encoding(response) or "utf-8")(errors="replace")
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size):
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            if raw is not None:
+                raw.append(text)
+            yield text
+            if received >= max_bytes:
+                return
+        yield decoder.decode(b"", final=True)
+    finally:
+        response.close()
+
+
+def extract_text(response, max_chars=20000, max_bytes=5 * 1024 * 1024, callback=None, raw=None):
+    pieces = read_response(response, max_bytes, raw=raw)
+    try:
+        return parse(pieces, response.url, max_chars, callback)
+    finally:
+        pieces.close()
+
+
+def extract_html(html, base_url, max_chars=20000, callback=None):
+    return parse([html], base_url, max_chars, callback)
+
+
+def extract_links(html, base_url):
+    collector = LinkCollector(base_url)
+    if html:
+        parser = get_parser(collector)
+        parser.feed(html)
+        parser.close()
+    return collector.links
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    if port and port != {"http": 80, "https": 443}[scheme]:
+        host = f"{host}:{port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
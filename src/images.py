@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gio, GLib, Gdk, GdkPixbuf
+
+from . import cache
+from . import network
+
+
+THUMBNAIL_WIDTH = 330
+
+
+class ImageLoader:
+    def __init__(self, memory_size=64, workers=4):
+        self.memory_size = memory_size
+        self.textures = OrderedDict()
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+        self.thumbnails = cache.DiskCache(
+            os.path.join(GLib.get_user_cache_dir(), "thumbnails.db"),
+            ttl=30 * 24 * 3600,
+            max_size=50 * 1024 * 1024,
+        )
+
+    def load(self, src, callback):
+        key = self.get_key(src)
+        if key is None:
+            return False
+
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.textures.move_to_end(key)
+            callback(texture)
+        elif key in self.pending:
+            self.pending[key].append(callback)
+        else:
+            self.pending[key] = [callback]
+            self.executor.submit(self.fetch, src, key)
+        return True
+
+    def get_key(self, src):
+        if src.startswith("http://") or src.startswith("https://"):
+            return src
+        try:
+            return f"{os.path.abspath(src)}:{os.stat(src).st_mtime_ns}"
+        except OSError:
+            return None
+
+    def fetch(self, src, key):
+        texture = None
+        try:
+            data = self.thumbnails.get(key)
+            if data is None:
+                data = self.create_thumbnail(src)
+                self.thumbnails.put(key, data)
+            texture = Gdk.Texture.new_from_bytes(GLib.Bytes.new(data))
+        except Exception as e:
+            print(f"Error: {src}: {e}")
+        finally:
+            GLib.idle_add(self.finish, key, texture)
+
+    def create_thumbnail(self, src):
+        if src.startswith("http://") or src.startswith("https://"):
+            with network.fetch(src) as response:
+                response.raise_for_status()
+                content = response.content
+            pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(
+                Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(content)),
+                width=THUMBNAIL_WIDTH,
+                height=-1,
+                preserve_aspect_ratio=True,
+                cancellable=None
+            )
+        else:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                src,
+                width=THUMBNAIL_WIDTH,
+                height=-1,
+                preserve_aspect_ratio=True
+            )
+        success, buffer = pixbuf.save_to_bufferv("png", [], [])
+        return bytes(buffer)
+
+    def finish(self, key, texture):
+        callbacks = self.pending.pop(key, [])
+        if texture is not None:
+            self.textures[key] = texture
+            self.textures.move_to_end(key)
+            while len(self.textures) > self.memory_size:
+                self.textures.popitem(last=False)
+        for callback in callbacks:
+            callback(texture)
+        return False
+
+
+loader = None
+loader_lock = threading.Lock()
+
+
+def get_loader():
+    global loader
+    with loader_lock:
+        if loader is None:
+            loader = ImageLoader()
+        return loader
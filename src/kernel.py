@@ -0,0 +1,306 @@
+import os
+import re
+import glob
+import json
+import uuid
+import venv
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import Future
+
+
+WORKER_SOURCE = """
+import os
+import sys
+import json
+import traceback
+import resource
+
+cwd = os.getcwd()
+session = {"__name__": "__main__"}
+
+while True:
+    request = sys.stdin.readline()
+    if not request:
+        break
+    request = json.loads(request)
+    os.chdir(cwd)
+    try:
+        scope = session if request["session"] else {"__name__": "__main__"}
+        exec(compile(request["code"], "<tool>", "exec"), scope)
+    except SystemExit:
+        pass
+    except BaseException:
+        traceback.print_exc(file=sys.__stdout__)
+    sys.stdout = sys.__stdout__
+    sys.stdout.flush()
+    print(request["token"], resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, flush=True)
+"""
+
+
+def canonical_name(requirement):
+    name = re.split(r"[<>=!~;\[\s]", requirement.strip(), maxsplit=1)[0]
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class VirtualEnv:
+    def __init__(self, path):
+        self.path = path
+        self.python = os.path.join(path, "bin", "python")
+        self.ready = None
+        self.lock = threading.Lock()
+        self.install_lock = threading.RLock()
+        self.packages = set()
+        self.packages_mtime = None
+
+    def bootstrap(self):
+        with self.lock:
+            if self.ready is None or (self.ready.done() and self.ready.exception()):
+                self.ready = Future()
+                threading.Thread(target=self.create, args=(self.ready,), daemon=True).start()
+            return self.ready
+
+    def create(self, ready):
+        try:
+            created = not os.path.exists(self.python)
+            if created:
+                venv.create(self.path, with_pip=True)
+            ready.set_result(created)
+        except Exception as e:
+            ready.set_exception(e)
+
+    def site_packages(self):
+        paths = glob.glob(os.path.join(self.path, "lib", "python*", "site-packages"))
+        return paths[0] if paths else None
+
+    def installed_packages(self):
+        path = self.site_packages()
+        if path is None:
+            return set()
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            if mtime == self.packages_mtime:
+                return self.packages
+
+        packages = set()
+        for entry in os.listdir(path):
+            if entry.endswith(".dist-info"):
+                packages.add(canonical_name(entry[:-len(".dist-info")].rsplit("-", 1)[0]))
+            elif not entry.startswith(("_", ".")):
+                packages.add(canonical_name(entry[:-3] if entry.endswith(".py") else entry))
+
+        with self.lock:
+            self.packages = packages
+            self.packages_mtime = mtime
+        return packages
+
+    def is_installed(self, module):
+        return canonical_name(module) in self.installed_packages()
+
+    def pip(self, *args):
+        subprocess.check_call([self.python, "-m", "pip", "--disable-pip-version-check", *args])
+
+    def install(self, modules, wheel_dir):
+        with self.install_lock:
+            os.makedirs(wheel_dir, exist_ok=True)
+            try:
+                self.pip("install", "--no-index", "--find-links", wheel_dir, *modules)
+            except subprocess.CalledProcessError:
+                self.pip("wheel", "--wheel-dir", wheel_dir, *modules)
+                self.pip("install", "--no-index", "--find-links", wheel_dir, *modules)
+
+
+class OutputCapture:
+    def __init__(self, head=8000, tail=8000):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def append(self, text):
+        accepted = text[:self.head_limit - self.head_size]
+        if accepted:
+            self.head.append(accepted)
+            self.head_size += len(accepted)
+            text = text[len(accepted):]
+        if not text:
+            return accepted
+
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.tail_limit:
+            excess = self.tail_size - self.tail_limit
+            if len(self.tail[0]) <= excess:
+                chunk = self.tail.popleft()
+                self.tail_size -= len(chunk)
+                self.dropped += len(chunk)
+            else:
+                self.tail[0] = self.tail[0][excess:]
+                self.tail_size -= excess
+                self.dropped += excess
+        return accepted
+
+    def is_truncated(self):
+        return bool(self.tail)
+
+    def get_tail(self):
+        omitted = f"\n... [{self.dropped} characters omitted] ...\n" if self.dropped else ""
+        return omitted + "".join(self.tail)
+
+    def __str__(self):
+        return "".join(self.head) + self.get_tail()
+
+
+class PythonWorker:
+    def __init__(self, python, cwd, session=False):
+        env = os.environ.copy()
+        env["PYTHONPATH"] = f"{env.get('PYTHONPATH', '')}:{os.getcwd()}"
+        self.process = subprocess.Popen(
+            [python, "-u", "-c", WORKER_SOURCE],
+            text=True,
+            env=env,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=1,
+        )
+        self.session = session
+        self.runs = 0
+        self.memory = 0
+
+    def run(self, code):
+        token = f"__WORKER_DONE__{uuid.uuid4().hex}"
+        self.runs += 1
+        self.process.stdin.write(json.dumps({"token": token, "code": code, "session": self.session}) + "\n")
+        self.process.stdin.flush()
+
+        for line in iter(self.process.stdout.readline, ""):
+            index = line.find(token)
+            if index == -1:
+                yield line
+                continue
+            if index:
+                yield line[:index]
+            self.memory = int(line[index + len(token):])
+            return
+        self.process.wait()
+
+    def write_input(self, text):
+        self.process.stdin.write(text + "\n")
+        self.process.stdin.flush()
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.is_alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class PythonWorkerPool:
+    def __init__(self, python, cwd, size=2, max_runs=50, max_memory=1024):
+        self.python = python
+        self.cwd = cwd
+        self.size = size
+        self.max_runs = max_runs
+        self.max_memory = max_memory
+        self.idle = []
+        self.spawning = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            while self.idle:
+                worker = self.idle.pop()
+                if worker.is_alive():
+                    break
+            else:
+                worker = None
+        if worker is None:
+            worker = PythonWorker(self.python, self.cwd)
+        self.prefork()
+        return worker
+
+    def release(self, worker):
+        if not self.is_reusable(worker):
+            worker.kill()
+        else:
+            with self.lock:
+                if len(self.idle) < self.size:
+                    self.idle.append(worker)
+                    worker = None
+            if worker:
+                worker.kill()
+        self.prefork()
+
+    def is_reusable(self, worker):
+        return (worker.is_alive() and worker.runs < self.max_runs
+                and worker.memory < self.max_memory * 1024)
+
+    def prefork(self):
+        with self.lock:
+            missing = self.size - len(self.idle) - self.spawning
+            self.spawning += max(missing, 0)
+        for _ in range(missing):
+            threading.Thread(target=self.spawn, daemon=True).start()
+
+    def spawn(self):
+        try:
+            worker = PythonWorker(self.python, self.cwd)
+        except OSError:
+            worker = None
+        with self.lock:
+            self.spawning -= 1
+            if worker:
+                self.idle.append(worker)
+
+    def shutdown(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for worker in idle:
+            worker.kill()
+
+
+class PythonSession:
+    def __init__(self, python, cwd):
+        self.python = python
+        self.cwd = cwd
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        self.lock.acquire()
+        if self.worker is None or not self.worker.is_alive():
+            try:
+                self.worker = PythonWorker(self.python, self.cwd, session=True)
+            except Exception:
+                self.lock.release()
+                raise
+        return self.worker
+
+    def release(self, worker):
+        self.lock.release()
+
+    def shutdown(self):
+        if self.worker:
+            self.worker.kill()
+            self.worker = None
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(python, cwd, size=2, max_runs=50, max_memory=1024):
+    key = (python, cwd, size, max_runs, max_memory)
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = PythonWorkerPool(python, cwd, size, max_runs, max_memory)
+        return pool
@@ -7,7 +7,7 @@ gi.require_version('Adw', '1')
 
 from gi.repository import Gtk, Gio, Adw, GLib, Gdk
 from .window import WienereWindow
-from .config import ConfigWindow
+from .config import ConfigWindow, get_config_manager
 
 
 
@@ -29,6 +29,10 @@ class WienereApplication(Adw.Application):
             win = WienereWindow(application=self)
         win.present()
 
+    def do_shutdown(self):
+        get_config_manager().flush()
+        Adw.Application.do_shutdown(self)
+
     def on_about_action(self, *args):
         about = Adw.AboutDialog(application_name='Wienere',
                                 application_icon='io.github.qwersyk.Wienere',
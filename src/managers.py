@@ -1,42 +1,126 @@
+import os
 import json
+import asyncio
+import hashlib
 import threading
-from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 
 from gi.repository import Gtk, GLib
 import base64
 from . import config
 from . import tools
-from openai import OpenAI
+from openai.types.chat import ChatCompletionMessage
+from . import cache
 from . import control
+from . import context
+from . import engine
+from . import network
+
+
+tool_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+
+response_cache = None
+response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global response_cache
+    with response_cache_lock:
+        if response_cache is None:
+            response_cache = cache.DiskCache(os.path.join(GLib.get_user_cache_dir(), "responses.db"))
+        return response_cache
+
+
+def serialize_message(message):
+    if isinstance(message, dict):
+        return message
+    return message.model_dump(mode="json", exclude_unset=True)
+
+
+def get_model_client(model):
+    return network.get_openai_client(
+        model.get("api_key"),
+        model.get("base_url"),
+        max_connections=config.parse_number(model.get("max_connections"), 10),
+        timeout=config.parse_number(model.get("timeout"), 600.0, float),
+    )
+
+
+def get_async_model_client(model):
+    return network.get_async_openai_client(
+        model.get("api_key"),
+        model.get("base_url"),
+        max_connections=config.parse_number(model.get("max_connections"), 10),
+        timeout=config.parse_number(model.get("timeout"), 600.0, float),
+    )
+
+
+class StreamBuffer:
+    def __init__(self, callback, interval=50):
+        self.callback = callback
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.parts = []
+        self.scheduled = False
+
+    def push(self, text):
+        with self.lock:
+            self.parts.append(text)
+            if self.scheduled:
+                return
+            self.scheduled = True
+        GLib.timeout_add(self.interval, self.flush)
+
+    def flush(self):
+        with self.lock:
+            text = "".join(self.parts)
+            self.parts = []
+            self.scheduled = False
+        if text:
+            self.callback(text)
+        return False
 
 
 class BaseChatManager:
     def __init__(self, name):
         self.messages = []
         self.result = None
+        self.done = threading.Event()
+        self.waiters = []
         self.name = name
-        self.config = config.ConfigManager()
+        self.config = config.get_config_manager()
         model = self.config.models.get(self.config.chats.get(name).get("model"))
-        self.client = OpenAI(
-            api_key=model.get("api_key"),
-        )
-        if model.get("base_url"):
-            self.client.base_url = model.get("base_url")
+        self.client = get_async_model_client(model)
         self.MODEL = model.get("MODEL")
+        self.context = context.ContextManager(
+            config.parse_number(model.get("context_tokens"), 0),
+            self.summarize if self.config.chats.get(name).get("summary_chat") else None
+        )
         if self.config.chats.get(name).get("start_message"):
             self.messages.append({
                 "role": "system",
                 "content": self.config.chats.get(name).get("start_message"),
             })
+        self.stream = self.config.chats.get(name).get("stream", True)
+        self.response_cache = get_response_cache() if self.config.chats.get(name).get("response_cache") else None
+        self.stream_view = None
+        self.turn_context = []
+        self.provider = network.get_provider(self.client.base_url)
+        self.usage = None
+        self.cache_stats = {"requests": 0, "hits": 0, "prompt_tokens": 0, "cached_tokens": 0}
         self.lock = threading.Lock()
         self.execution_control = control.ExecutionControl()
 
     def send_message(self, message):
+        self.done.clear()
+        self.end_stream()
         with self.lock:
             self.messages.append({
                 "role": "user",
                 "content": message,
             })
+        self.turn_context = self.get_turn_context(message)
         self.active_page = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         self.active_page.set_valign(Gtk.Align.START)
         exec_id = self.execution_control.start_new()
@@ -44,44 +128,234 @@ class BaseChatManager:
         return self.active_page
 
     def process_message(self, exec_id):
-        def get_response():
-            if not self.execution_control.is_current(exec_id):
-                return
+        self.execution_control.track(exec_id, engine.submit(self.get_response(exec_id)))
 
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.MODEL,
-                    messages=self.get_messages(),
-                )
-                GLib.idle_add(self.handle_response, response, exec_id)
-            except Exception as e:
-                GLib.idle_add(self.handle_error, str(e))
-        threading.Thread(target=get_response, daemon=True).start()
+    async def get_response(self, exec_id):
+        if not self.execution_control.is_current(exec_id):
+            return
 
+        try:
+            if self.context.budget:
+                await asyncio.to_thread(self.compact_messages)
+            response_message = await self.request_completion(exec_id, **self.get_request_params())
+            GLib.idle_add(self.handle_response, response_message, exec_id)
+        except Exception as e:
+            GLib.idle_add(self.handle_error, str(e))
+
+    def get_request_params(self):
+        return {
+            "model": self.MODEL,
+            "messages": self.add_turn_context(self.get_messages()),
+        }
+
+    def get_turn_context(self, message):
+        return []
+
+    def add_turn_context(self, messages):
+        if not self.turn_context:
+            return messages
+        for index in range(len(messages) - 1, -1, -1):
+            if context.get_field(messages[index], "role") == "user":
+                return messages[:index + 1] + self.turn_context + messages[index + 1:]
+        return messages + self.turn_context
+
+    def add_cache_hints(self, params):
+        if self.provider == "openai":
+            params["extra_body"] = {"prompt_cache_key": f"wienere-{self.name}"}
+        elif self.provider == "openrouter":
+            messages = list(params["messages"])
+            for index, message in enumerate(messages):
+                if message.get("role") != "system" or not isinstance(message.get("content"), str):
+                    break
+                messages[index] = dict(message, content=[{
+                    "type": "text",
+                    "text": message["content"],
+                    "cache_control": {"type": "ephemeral"},
+                }])
+            params["messages"] = messages
+        return params
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        self.usage = {
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_hit": cached_tokens > 0,
+        }
+        self.cache_stats["requests"] += 1
+        self.cache_stats["hits"] += cached_tokens > 0
+        self.cache_stats["prompt_tokens"] += usage.prompt_tokens or 0
+        self.cache_stats["cached_tokens"] += cached_tokens
+        print(f"{self.name}: {self.format_usage()}, "
+              f"{self.cache_stats['hits']}/{self.cache_stats['requests']} requests hit the prompt cache")
+
+    def format_usage(self):
+        return (f"{self.usage['prompt_tokens']} prompt tokens, {self.usage['cached_tokens']} cached "
+                f"({'hit' if self.usage['cache_hit'] else 'miss'})")
+
+    def compact_messages(self):
+        with self.lock:
+            messages = list(self.messages)
+        compacted = self.context.compact(messages)
+        if compacted is not messages:
+            with self.lock:
+                self.messages = compacted + self.messages[len(messages):]
+
+    def summarize(self, messages):
+        chat = self.config.chats.get(self.config.chats.get(self.name).get("summary_chat"))
+        if not chat:
+            return None
+        model = self.config.models.get(chat.get("model"))
+        try:
+            response = get_model_client(model).chat.completions.create(
+                model=model.get("MODEL"),
+                messages=[
+                    {
+                        "role": "system",
+                        "content": chat.get("start_message") or "Summarize the following conversation. Keep facts, decisions and open questions.",
+                    },
+                    {
+                        "role": "user",
+                        "content": self.context.transcript(messages),
+                    },
+                ],
+            )
+        except Exception:
+            return None
+        return response.choices[0].message.content
+
+    async def request_completion(self, exec_id, **params):
+        self.usage = None
+        params = self.add_cache_hints(params)
+        if not self.response_cache:
+            return await self.create_completion(exec_id, params)
+
+        key = hashlib.sha256(json.dumps(
+            [str(self.client.base_url), params],
+            sort_keys=True,
+            default=str
+        ).encode()).hexdigest()
+        cached = await asyncio.to_thread(self.response_cache.get, key)
+        if cached is not None:
+            return ChatCompletionMessage.model_validate_json(cached)
+
+        response_message = await self.create_completion(exec_id, params)
+        if self.execution_control.is_current(exec_id):
+            await asyncio.to_thread(self.response_cache.put, key, json.dumps(serialize_message(response_message)))
+        return response_message
+
+    async def create_completion(self, exec_id, params):
+        if not self.stream:
+            response = await self.client.chat.completions.create(**params)
+            self.record_usage(response.usage)
+            return response.choices[0].message
+
+        if self.provider:
+            params["stream_options"] = {"include_usage": True}
+
+        content = []
+        tool_calls = {}
+        stream_buffer = StreamBuffer(lambda text: self.on_stream_delta(text, exec_id))
+        stream = await self.client.chat.completions.create(stream=True, **params)
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    self.record_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content.append(delta.content)
+                    stream_buffer.push(delta.content)
+                for tool_call in delta.tool_calls or []:
+                    call = tool_calls.setdefault(tool_call.index, {
+                        "id": None,
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""},
+                    })
+                    if tool_call.id:
+                        call["id"] = tool_call.id
+                    if tool_call.function:
+                        if tool_call.function.name:
+                            call["function"]["name"] += tool_call.function.name
+                        if tool_call.function.arguments:
+                            call["function"]["arguments"] += tool_call.function.arguments
+        finally:
+            await stream.close()
+        GLib.idle_add(stream_buffer.flush)
 
-    def handle_response(self, response, exec_id):
+        if tool_calls:
+            return ChatCompletionMessage(
+                role="assistant",
+                content="".join(content) or None,
+                tool_calls=[tool_calls[index] for index in sorted(tool_calls)],
+            )
+        return ChatCompletionMessage(role="assistant", content="".join(content) or None)
+
+    def on_stream_delta(self, text, exec_id):
         if not self.execution_control.is_current(exec_id):
-            return False
+            return
+        if self.stream_view is None:
+            self.stream_view = tools.MarkdownView()
+            self.active_page.append(self.stream_view)
+        self.stream_view.append_markdown(text)
 
-        response_message = response.choices[0].message
+    def end_stream(self):
+        stream_view = self.stream_view
+        self.stream_view = None
+        return stream_view
+
+    def handle_response(self, response_message, exec_id):
+        if not self.execution_control.is_current(exec_id):
+            return False
 
         with self.lock:
-            self.messages.append(response_message)
+            self.messages.append(serialize_message(response_message))
 
-        self.display_message(response.choices[0].message.content)
+        self.display_message(response_message.content)
 
         return False
 
     def display_message(self, content):
         self.result = content
-
-        self.active_page.append(tools.MarkdownView(content))
+        self.set_done()
+
+        if self.end_stream() is None:
+            self.active_page.append(tools.MarkdownView(content))
+        if self.usage:
+            label = Gtk.Label(label=self.format_usage())
+            label.add_css_class("dim-label")
+            label.add_css_class("caption")
+            label.set_halign(Gtk.Align.END)
+            label.set_margin_start(12)
+            label.set_margin_end(12)
+            self.active_page.append(label)
 
     def get_result(self):
         return self.result
 
+    def set_done(self):
+        with self.lock:
+            self.done.set()
+            waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(lambda waiter=waiter: waiter.done() or waiter.set_result(None))
+
+    async def wait_done(self):
+        waiter = asyncio.get_running_loop().create_future()
+        with self.lock:
+            if self.done.is_set():
+                return
+            self.waiters.append(waiter)
+        await waiter
+
     def handle_error(self, error):
+        self.end_stream()
         self.result = error
+        self.set_done()
         label = Gtk.Label(label=error)
         label.set_wrap(True)
         label.set_halign(Gtk.Align.START)
@@ -97,6 +371,9 @@ class BaseChatManager:
     def get_messages(self):
         return self.messages
 
+    def close(self):
+        self.execution_control.stop_all()
+
 
 class ToolChatManager(BaseChatManager):
 
@@ -105,14 +382,36 @@ class ToolChatManager(BaseChatManager):
         self.tools = []
         for tool_name in self.config.chats.get(name).get("tools"):
             tool = tools.tools.get(self.config.tools.get(tool_name)["type"])(tool_name)
-            if type(tool) == tools.ToolMemory:
-                self.messages.append({
-                    "role": "system",
-                    "content": "\n".join(tool.get_note()),
-                })
             self.tools.append(tool)
+        self.tool_schemas = None
+        self.config_handler = self.config.connect("changed", self.on_config_changed)
 
-        self.widget_queue = Queue()
+    def on_config_changed(self, manager, category, name):
+        if category != "tools":
+            return
+        for tool in self.tools:
+            if tool.name == name:
+                tool.invalidate()
+                self.tool_schemas = None
+
+    def get_tool_schemas(self):
+        tool_schemas = self.tool_schemas
+        if tool_schemas is None:
+            tool_schemas = [tool.get_tool() for tool in self.tools]
+            self.tool_schemas = tool_schemas
+        return tool_schemas
+
+    def get_turn_context(self, message):
+        turn_context = []
+        for tool in self.tools:
+            if type(tool) == tools.ToolMemory:
+                notes = tool.recall(message)
+                if notes:
+                    turn_context.append({
+                        "role": "system",
+                        "content": "\n".join(notes),
+                    })
+        return turn_context
 
     def send_message(self, message, files=None):
         if files:
@@ -122,98 +421,118 @@ class ToolChatManager(BaseChatManager):
             })
         return super().send_message(message)
 
-    def process_message(self, exec_id):
-        def get_response():
-            if not self.execution_control.is_current(exec_id):
-                return
-
-            try:
-
-                response = self.client.chat.completions.create(
-                    model=self.MODEL,
-                    messages=self.get_messages(),
-                    tools=[tool.get_tool() for tool in self.tools],
-                )
-                GLib.idle_add(self.handle_response, response, exec_id)
-            except Exception as e:
-                GLib.idle_add(self.handle_error, str(e))
-        threading.Thread(target=get_response, daemon=True).start()
+    def get_request_params(self):
+        return {
+            "model": self.MODEL,
+            "messages": self.add_turn_context(self.get_messages()),
+            "tools": self.get_tool_schemas(),
+        }
 
-
-    def handle_response(self, response, exec_id):
+    def handle_response(self, response_message, exec_id):
         if not self.execution_control.is_current(exec_id):
             return False
 
-        response_message = response.choices[0].message
-        if response_message.tool_calls:
-            response_message.tool_calls = response_message.tool_calls[:1]
         tool_calls = response_message.tool_calls
 
         with self.lock:
-            self.messages.append(response_message)
+            self.messages.append(serialize_message(response_message))
 
         if tool_calls:
-
-            for tool_call in tool_calls:
-                self.widget_queue.put((tool_call, exec_id))
-            self.process_next_widget(exec_id)
+            self.end_stream()
+            self.run_tool_calls(tool_calls, exec_id)
         else:
-            self.display_message(response.choices[0].message.content)
+            self.display_message(response_message.content)
 
         return False
 
-    def process_next_widget(self, exec_id):
-        if not self.execution_control.is_current(exec_id) or self.widget_queue.empty():
-            if self.widget_queue.empty() and self.execution_control.is_current(exec_id):
-                self.process_message(exec_id)
-            return
-
-        tool_call, current_exec_id = self.widget_queue.get()
-        if current_exec_id != exec_id:
-            self.process_next_widget(exec_id)
-            return
+    def get_tool(self, name):
+        for tool in self.tools:
+            if name == tool.get_name():
+                return tool
+        return None
+
+    def run_tool_calls(self, tool_calls, exec_id):
+        results = []
+        widgets = []
+        for tool_call in tool_calls:
+            message = {
+                "tool_call_id": tool_call.id,
+                "role": "tool",
+                "name": tool_call.function.name,
+            }
+            results.append(message)
+
+            tool = self.get_tool(tool_call.function.name)
+            if tool is None:
+                message["content"] = f"Unknown tool: {tool_call.function.name}"
+                continue
+            try:
+                function_args = json.loads(tool_call.function.arguments)
+            except json.JSONDecodeError as e:
+                message["content"] = f"Invalid arguments: {e}"
+                continue
 
-        function_name = tool_call.function.name
-        function_args = json.loads(tool_call.function.arguments)
+            try:
+                widget = tool.get_widget(function_args)
+            except Exception as e:
+                message["content"] = f"Error: {e}"
+                continue
+            message["widget"] = widget
+            self.add_widget_to_page(widget)
+            widgets.append(widget)
+
+        self.execution_control.track(exec_id, engine.submit(self.run_tools(widgets, results, exec_id)))
+
+    async def run_tools(self, widgets, results, exec_id):
+        errors = await asyncio.gather(*(self.run_widget(widget) for widget in widgets))
+        for message in results:
+            error = errors[widgets.index(message["widget"])] if "widget" in message else None
+            if error is not None:
+                message.pop("widget")
+                message["content"] = f"Error: {error}"
+        GLib.idle_add(self.finish_tool_calls, results, exec_id)
+
+    async def run_widget(self, widget):
+        try:
+            if hasattr(widget, "run_async"):
+                await widget.run_async()
+            else:
+                await asyncio.get_running_loop().run_in_executor(tool_executor, widget.run)
+        except asyncio.CancelledError:
+            widget.stop()
+            raise
+        except Exception as e:
+            return e
+        return None
+
+    def finish_tool_calls(self, results, exec_id):
+        if not self.execution_control.is_current(exec_id):
+            return False
+        for message in results:
+            if "widget" in message:
+                message["content"] = str(message.pop("widget"))
+        with self.lock:
+            self.messages.extend(results)
+        self.process_message(exec_id)
+        return False
 
+    def close(self):
+        super().close()
+        if self.config_handler:
+            self.config.disconnect(self.config_handler)
+            self.config_handler = None
         for tool in self.tools:
-            if function_name == tool.get_name():
-                widget = tool.get_widget(function_args)
-                GLib.idle_add(self.add_widget_to_page, widget)
-
-                threading.Thread(
-                    target=self.run_widget,
-                    args=(widget, tool_call, exec_id),
-                    daemon=True
-                ).start()
-                break
-
-    def run_widget(self, widget, tool_call, exec_id):
-        t = threading.Thread(target=widget.run, daemon=True)
-        t.start()
-        while t.is_alive():
-            if not self.execution_control.is_current(exec_id):
-                widget.stop()
-                return
-        if self.execution_control.is_current(exec_id):
-            with self.lock:
-                self.messages.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": tool_call.function.name,
-                    "widget": widget
-                })
-            GLib.idle_add(self.process_next_widget, exec_id)
+            tool.close()
 
     def get_messages(self):
         with self.lock:
-            return [message if "widget" not in message else {k if k != "widget" else "content": str(v) for k, v in
-                                                             message.items()} for message in self.messages]
+            return list(self.messages)
 
 
 class VisionChatManager(BaseChatManager):
     def send_message(self, message, images=None):
-
+        self.done.clear()
+        self.end_stream()
         exec_id = self.execution_control.start_new()
         if True:
             with self.lock:
@@ -245,18 +564,14 @@ class VisionChatManager(BaseChatManager):
         return self.active_page
 
     def process_message(self, exec_id, images=None):
-        def get_response():
-            if not self.execution_control.is_current(exec_id):
-                return
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.MODEL,
-                    messages=self.get_messages(images=images),
-                )
-                GLib.idle_add(self.handle_response, response, exec_id)
-            except Exception as e:
-                GLib.idle_add(self.handle_error, str(e))
-        threading.Thread(target=get_response, daemon=True).start()
+        self.images = images
+        super().process_message(exec_id)
+
+    def get_request_params(self):
+        return {
+            "model": self.MODEL,
+            "messages": self.get_messages(images=self.images),
+        }
 
     def get_messages(self, images=None):
         if images and self.messages and self.messages[-1]["role"] == "user":
@@ -0,0 +1,94 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+
+
+class MemoryStore:
+    def __init__(self, path, legacy_file=None):
+        self.path = path
+        self.lock = threading.Lock()
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS notes ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "note TEXT NOT NULL, "
+                "created REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS notes_created ON notes (created)")
+            self.searchable = self.create_search_index(connection)
+        if legacy_file and os.path.exists(legacy_file):
+            self.migrate(legacy_file)
+
+    def create_search_index(self, connection):
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'notes_index'"
+        ).fetchone()
+        try:
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS notes_index "
+                "USING fts5(note, content='notes', content_rowid='id')"
+            )
+        except sqlite3.OperationalError:
+            return False
+        connection.execute(
+            "CREATE TRIGGER IF NOT EXISTS notes_insert AFTER INSERT ON notes BEGIN "
+            "INSERT INTO notes_index (rowid, note) VALUES (new.id, new.note); END"
+        )
+        if not exists:
+            connection.execute("INSERT INTO notes_index (notes_index) VALUES ('rebuild')")
+        return True
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def migrate(self, legacy_file):
+        with open(legacy_file, 'r') as file:
+            notes = json.load(file)
+        now = time.time()
+        with self.lock, self.connect() as connection:
+            if not connection.execute("PRAGMA user_version").fetchone()[0]:
+                connection.executemany(
+                    "INSERT INTO notes (note, created) VALUES (?, ?)",
+                    [(str(note), now) for note in notes]
+                )
+                connection.execute("PRAGMA user_version = 1")
+        os.replace(legacy_file, legacy_file + ".migrated")
+
+    def add_note(self, note):
+        with self.lock, self.connect() as connection:
+            connection.execute(
+                "INSERT INTO notes (note, created) VALUES (?, ?)",
+                (str(note), time.time())
+            )
+
+    def get_notes(self):
+        with self.connect() as connection:
+            return [row[0] for row in connection.execute("SELECT note FROM notes ORDER BY id")]
+
+    def search(self, query, limit=10, token_budget=1000):
+        words = [word for word in re.findall(r"\w+", query.lower()) if len(word) > 2]
+        with self.connect() as connection:
+            if self.searchable and words:
+                rows = connection.execute(
+                    "SELECT note FROM notes_index WHERE notes_index MATCH ? "
+                    "ORDER BY bm25(notes_index) LIMIT ?",
+                    (" OR ".join(f'"{word}"' for word in set(words)), limit)
+                )
+            else:
+                rows = connection.execute(
+                    "SELECT note FROM notes ORDER BY id DESC LIMIT ?", (limit,)
+                )
+            notes = [row[0] for row in rows]
+
+        selected = []
+        for note in notes:
+            tokens = len(note) // 4 + 1
+            if tokens > token_budget:
+                break
+            token_budget -= tokens
+            selected.append(note)
+        return selected
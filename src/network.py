@@ -0,0 +1,133 @@
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from fake_useragent import UserAgent
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+
+def get_provider(base_url):
+    host = httpx.URL(str(base_url)).host
+    if host == "api.openai.com":
+        return "openai"
+    if host == "openrouter.ai":
+        return "openrouter"
+    return None
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key, base_url=None, max_connections=10, timeout=600.0):
+    key = (base_url or None, api_key, max_connections, timeout)
+    with clients_lock:
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url or None,
+                timeout=timeout,
+                http_client=DefaultHttpxClient(
+                    timeout=httpx.Timeout(timeout, connect=10.0),
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=60.0,
+                    ),
+                ),
+            )
+        return client
+
+
+async_clients = {}
+
+
+def get_async_openai_client(api_key, base_url=None, max_connections=10, timeout=600.0):
+    key = (base_url or None, api_key, max_connections, timeout)
+    with clients_lock:
+        client = async_clients.get(key)
+        if client is None:
+            client = async_clients[key] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url or None,
+                timeout=timeout,
+                http_client=DefaultAsyncHttpxClient(
+                    timeout=httpx.Timeout(timeout, connect=10.0),
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=60.0,
+                    ),
+                ),
+            )
+        return client
+
+
+MAX_CONNECTIONS = 16
+
+user_agent = None
+sessions = {}
+host_limits = {}
+host_times = {}
+fetch_limit = threading.BoundedSemaphore(MAX_CONNECTIONS)
+sessions_lock = threading.Lock()
+
+
+def get_user_agent():
+    global user_agent
+    with sessions_lock:
+        if user_agent is None:
+            user_agent = UserAgent()
+    return user_agent.random
+
+
+def get_session(url):
+    host = urlsplit(url).netloc.lower()
+    with sessions_lock:
+        session = sessions.get(host)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONNECTIONS)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = get_user_agent()
+        with sessions_lock:
+            session = sessions.setdefault(host, session)
+    return session
+
+
+def get_host_limit(url, max_host_connections):
+    host = urlsplit(url).netloc.lower()
+    with sessions_lock:
+        limit = host_limits.get(host)
+        if limit is None:
+            limit = host_limits[host] = threading.BoundedSemaphore(max_host_connections)
+        return limit
+
+
+def wait_for_host(url, min_interval):
+    host = urlsplit(url).netloc.lower()
+    with sessions_lock:
+        now = time.monotonic()
+        start = max(now, host_times.get(host, 0) + min_interval)
+        host_times[host] = start
+    if start > now:
+        time.sleep(start - now)
+
+
+@contextmanager
+def fetch(url, max_host_connections=4, min_interval=0, timeout=10, **kwargs):
+    if min_interval:
+        wait_for_host(url, min_interval)
+    host_limit = get_host_limit(url, max_host_connections)
+    with fetch_limit, host_limit:
+        response = get_session(url).get(url, timeout=timeout, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
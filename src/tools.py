@@ -1,31 +1,93 @@
 import os
 import re
 import ast
-import time
 import json
+import time
 import subprocess
+import hashlib
 import threading
-import venv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
-from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urlsplit
 
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
-from gi.repository import Gtk, Gio, Adw, GLib, Gdk, Pango, GdkPixbuf
+from gi.repository import Gtk, Adw, GLib, Pango
 
-import requests
 from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 import markdown
 
 from . import config
 from . import managers
+from . import kernel
+from . import memory
+from . import extract
+from . import cache
+from . import network
+from . import images
+from . import engine
+
+
+VENV_DIR = os.path.join(GLib.get_user_cache_dir(), "python_venv")
+WHEEL_DIR = os.path.join(GLib.get_user_cache_dir(), "python_wheels")
+python_venv = kernel.VirtualEnv(VENV_DIR)
+fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fetch")
+
+fetch_cache = None
+fetch_cache_lock = threading.Lock()
+
+
+def get_fetch_cache():
+    global fetch_cache
+    with fetch_cache_lock:
+        if fetch_cache is None:
+            fetch_cache = cache.DiskCache(
+                os.path.join(GLib.get_user_cache_dir(), "fetch.db"),
+                max_size=200 * 1024 * 1024,
+            )
+        return fetch_cache
+
+
+def fetch_page(url, limits, callback=None):
+    max_chars = limits.get("max_chars", 20000)
+    max_bytes = limits.get("max_bytes", 5 * 1024 * 1024)
+    fetch_cache = get_fetch_cache()
+    entry = fetch_cache.get(url)
+    entry = json.loads(entry) if entry else None
+    extract_limits = [max_chars, max_bytes]
+
+    if entry and entry["limits"] == extract_limits and time.time() - entry["fetched"] < limits.get("fresh_for", 600):
+        return entry
+    if entry and (max_chars > entry["limits"][0] or max_bytes > entry["limits"][1]):
+        entry = None
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    with network.fetch(url, limits.get("max_host_connections", 4), limits.get("min_interval", 0),
+                       headers=headers, stream=True) as response:
+        if entry and response.status_code == 304:
+            if entry["limits"] != extract_limits:
+                entry["text"] = extract.extract_html(entry["html"], url, max_chars)
+        else:
+            response.raise_for_status()
+            raw = []
+            text = extract.extract_text(response, max_chars, max_bytes, callback, raw)
+            entry = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "html": "".join(raw),
+                "text": text,
+            }
 
-
-
-
+    if "no-store" not in response.headers.get("Cache-Control", ""):
+        entry["limits"] = extract_limits
+        entry["fetched"] = time.time()
+        fetch_cache.put(url, json.dumps(entry))
+    return entry
 
 
 class Tool:
@@ -33,12 +95,21 @@ class Tool:
 
     def __init__(self, name):
         self.name = name
-        self.config = config.ConfigManager()
+        self.config = config.get_config_manager()
+        self.schema = None
 
     def get_dependencies(self):
         return []
 
     def get_tool(self):
+        if self.schema is None:
+            self.schema = self.build_tool()
+        return self.schema
+
+    def invalidate(self):
+        self.schema = None
+
+    def build_tool(self):
         return {
             "type": "function",
             "function": {
@@ -63,6 +134,9 @@ class Tool:
     def get_widget(self, function_args) -> Adw.Bin:
         pass
 
+    def close(self):
+        pass
+
 class Widget(Adw.Bin):
     name = "Widget"
     icon = "applications-system-symbolic"
@@ -128,6 +202,13 @@ class Widget(Adw.Bin):
         return self.result
 
 class ToolPython(Tool):
+    def __init__(self, name):
+        super().__init__(name)
+        self.session = None
+        if self.config.tools.get(self.name).get("session_kernel", "").strip().lower() in ("1", "true", "yes"):
+            self.session = kernel.PythonSession(python_venv.python, GLib.get_user_data_dir())
+        python_venv.bootstrap().add_done_callback(self.prefork)
+
     def get_parameters(self):
         return {
             "name": {
@@ -146,21 +227,49 @@ class ToolPython(Tool):
         }
 
     def get_dependencies(self):
-        return ["name_description", "code_description", "modules_description"]
+        return ["name_description", "code_description", "modules_description",
+                "pool_size", "max_runs", "memory_limit_mb", "session_kernel",
+                "output_head_chars", "output_tail_chars"]
 
     def get_required(self):
         return ["name", "code"]
 
+    def get_pool_settings(self):
+        settings = self.config.tools.get(self.name)
+        return {
+            "size": int(settings.get("pool_size") or 2),
+            "max_runs": int(settings.get("max_runs") or 50),
+            "max_memory": int(settings.get("memory_limit_mb") or 1024),
+        }
+
+    def prefork(self, ready):
+        if self.session is None and ready.exception() is None:
+            kernel.get_pool(python_venv.python, GLib.get_user_data_dir(), **self.get_pool_settings()).prefork()
+
+    def get_output_budget(self):
+        settings = self.config.tools.get(self.name)
+        return {
+            "head": int(settings.get("output_head_chars") or 8000),
+            "tail": int(settings.get("output_tail_chars") or 8000),
+        }
+
     def get_widget(self, function_args) -> Adw.Bin:
         return WidgetPython(
             function_args.get("name", "Python Code"),
             function_args.get("code"),
-            function_args.get("modules", [])
+            function_args.get("modules", []),
+            self.get_pool_settings(),
+            self.session,
+            self.get_output_budget()
         )
 
     def get_name(self):
         return self.name
 
+    def close(self):
+        if self.session:
+            self.session.shutdown()
+
 
 class ExpressionFinder(ast.NodeVisitor):
     def __init__(self):
@@ -191,18 +300,22 @@ def custom_getpass(prompt="Password: "):
 
 getpass.getpass = custom_getpass
 """
-    def __init__(self, name, code, modules):
+    def __init__(self, name, code, modules, pool_settings=None, session=None, output_budget=None):
         self.code = code
         self.background = False
         self.modules = modules
         self.name = name
+        self.pool_settings = pool_settings or {}
+        self.session = session
+        self.output_budget = output_budget or {}
+        self.worker = None
+        self.stopped = False
+        self.input_dialog = None
+        self.answered = None
 
         self.icon = "applications-system-symbolic"
 
-        self.installed_modules_file = os.path.join(GLib.get_user_config_dir(), "installed_modules.json")
-        self.installed_modules = self.load_installed_modules()
-        self.venv_dir = os.path.join(GLib.get_user_cache_dir(), "python_venv")
-        self.create_virtual_env()
+        self.venv_dir = VENV_DIR
 
         super().__init__()
 
@@ -240,7 +353,7 @@ getpass.getpass = custom_getpass
             for module in modules:
                 label = Gtk.Label(label=module)
                 label.set_halign(Gtk.Align.START)
-                if module in self.installed_modules:
+                if python_venv.is_installed(module):
                     label.add_css_class("success")
                 else:
                     label.add_css_class("warning")
@@ -248,28 +361,38 @@ getpass.getpass = custom_getpass
                 self.modules_list[module] = label
             self.details_box.append(flow_box)
 
-    def create_virtual_env(self):
-        if not os.path.exists(self.venv_dir):
-            venv.create(self.venv_dir, with_pip=True)
+    def wait_virtual_env(self):
+        ready = python_venv.bootstrap()
+        if ready.done():
+            return ready.result()
+
+        self.update_output("Preparing virtual environment...")
+
+        def pulse():
+            self.progress_bar.pulse()
+            return not ready.done()
+
+        GLib.timeout_add(100, pulse)
+        if ready.result():
             self.update_output("Virtual environment created.")
+        GLib.idle_add(self.set_progress, 0)
 
     def on_copy_clicked(self, entry, icon_pos):
         clipboard = self.get_display().get_clipboard()
         clipboard.set(self.code)
 
-    def load_installed_modules(self):
-        if os.path.exists(self.installed_modules_file):
-            with open(self.installed_modules_file, 'r') as f:
-                return set(json.load(f))
-        return set()
-
-    def save_installed_modules(self):
-        with open(self.installed_modules_file, 'w') as f:
-            json.dump(list(self.installed_modules), f)
-
     def run(self):
         def execute_action():
-            modules_to_install = [m for m in self.modules if m not in self.installed_modules]
+            try:
+                self.wait_virtual_env()
+            except Exception as e:
+                self.result = f"Failed to create virtual environment: {e}"
+                self.update_output(self.result)
+                GLib.idle_add(self.progress_bar.add_css_class, "error")
+                GLib.idle_add(self.set_progress, 1)
+                return
+
+            modules_to_install = [m for m in self.modules if not python_venv.is_installed(m)]
             if modules_to_install:
                 event = threading.Event()
                 GLib.idle_add(self.show_module_install_dialog, modules_to_install, event)
@@ -308,22 +431,30 @@ getpass.getpass = custom_getpass
         dialog.destroy()
 
     def install_modules(self, modules_to_install, event):
-        for module in modules_to_install:
+        with python_venv.install_lock:
+            missing = [module for module in modules_to_install if not python_venv.is_installed(module)]
             try:
-                self.update_output(f"Installing {module} in virtual environment...")
-                subprocess.check_call([os.path.join(self.venv_dir, "bin", "python"), "-m", "pip", "install", module])
-                self.update_output(f"{module} installed successfully.")
-                self.installed_modules.add(module)
-                self.modules_list[module].set_css_classes(["success"])
-
+                if missing:
+                    self.update_output(f"Installing {', '.join(missing)} in virtual environment...")
+                    python_venv.install(missing, WHEEL_DIR)
+                self.update_output("Modules installed successfully.")
             except subprocess.CalledProcessError as e:
-                self.update_output(f"Failed to install {module}: {e}")
-                self.modules_list[module].set_css_classes(["error"])
+                self.update_output(f"Failed to install modules together: {e}")
+                for module in missing:
+                    try:
+                        python_venv.install([module], WHEEL_DIR)
+                        self.update_output(f"{module} installed successfully.")
+                    except subprocess.CalledProcessError as e:
+                        self.update_output(f"Failed to install {module}: {e}")
 
-        self.save_installed_modules()
+        for module in modules_to_install:
+            css_class = "success" if python_venv.is_installed(module) else "error"
+            GLib.idle_add(self.modules_list[module].set_css_classes, [css_class])
         event.set()
 
     def input(self, prompt="", password=False):
+        if self.stopped:
+            return ""
         dialog = Adw.MessageDialog.new(
             self.get_root(),
             "Input Required" if not password else "Password Required",
@@ -349,86 +480,86 @@ getpass.getpass = custom_getpass
         dialog.set_default_response("ok")
         dialog.set_close_response("cancel")
 
-        result = None
+        result = ""
+        answered = threading.Event()
 
         def on_response(dialog, response):
             nonlocal result
             if response == "ok":
                 result = entry.get_text()
             dialog.destroy()
+            answered.set()
 
         dialog.connect("response", on_response)
-
+        self.input_dialog = dialog
+        self.answered = answered
 
         dialog.present()
 
-        while result is None:
-            if not dialog.is_visible():
-                return ""
-            time.sleep(0.1)
-
+        answered.wait()
+        self.input_dialog = None
         return result
 
     def execute_code(self):
         try:
-            env = os.environ.copy()
-            env["PYTHONPATH"] = f"{env.get('PYTHONPATH', '')}:{os.getcwd()}"
-            process = subprocess.Popen(
-                [os.path.join(self.venv_dir, "bin", "python"), "-c", self.injection+self.wrap_code_with_expression_capture()],
-                text=True,
-                env=env,
-                cwd=GLib.get_user_data_dir(),
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=1,
-                universal_newlines=True
+            pool = self.session or kernel.get_pool(
+                os.path.join(self.venv_dir, "bin", "python"),
+                GLib.get_user_data_dir(),
+                **self.pool_settings
             )
-            self.result= ""
-            input_requested = False
+            self.worker = pool.acquire()
+            capture = kernel.OutputCapture(**self.output_budget)
+            output = managers.StreamBuffer(self.append_output, 100)
 
             try:
-                while True:
-
-                    line = process.stdout.readline()
-                    print(line)
-                    if line == '' and process.poll() is not None:
-                        break
-
+                for line in self.worker.run(self.injection+self.wrap_code_with_expression_capture()):
                     if line.startswith("__INPUT_HANDLER__"):
-                        input_requested = True
                         prompt = line[17:]
                         user_input = self.input(prompt.strip())
-                        self.result+="\n"+prompt.strip()+user_input
-                        process.stdin.write(user_input + "\n")
-                        process.stdin.flush()
+                        text = prompt.strip()+user_input+"\n"
+                        self.worker.write_input(user_input)
                     elif line.startswith("__GETPASS_HANDLER__"):
-                        input_requested = True
                         prompt = line[19:]
                         user_input = self.input(prompt.strip(), password=True)
-                        self.result+="\n"+prompt.strip()+"********"
-                        process.stdin.write(user_input + "\n")
-                        process.stdin.flush()
+                        text = prompt.strip()+"********\n"
+                        self.worker.write_input(user_input)
                     else:
-                        self.result+="\n"+line.strip()
-                        if input_requested:
-                            input_requested = False
+                        text = line
+                    accepted = capture.append(text)
+                    if accepted:
+                        output.push(accepted)
 
             finally:
-                process.stdin.close()
-                process.wait()
+                pool.release(self.worker)
+            if capture.is_truncated():
+                output.push(capture.get_tail())
+            GLib.idle_add(output.flush)
             self.command_entry.add_css_class("success")
             self.progress_bar.add_css_class("success")
+            self.result = str(capture).strip()
             if not self.result:
                 self.result = "Done"
+                self.update_output(self.result)
         except Exception as e:
             self.result = str(e)
             self.command_entry.add_css_class("error")
             self.progress_bar.add_css_class("error")
+            GLib.idle_add(self.update_output, self.result)
 
-        GLib.idle_add(self.update_output, self.result)
         GLib.idle_add(self.set_progress, 1)
 
+    def append_output(self, text):
+        self.output_buffer.insert(self.output_buffer.get_end_iter(), text)
+
+    def stop(self):
+        self.stopped = True
+        if self.worker:
+            self.worker.kill()
+        if self.answered:
+            self.answered.set()
+        if self.input_dialog:
+            GLib.idle_add(self.input_dialog.destroy)
+
     def wrap_code_with_expression_capture(self):
         try:
             tree = ast.parse(self.code)
@@ -481,19 +612,23 @@ getpass.getpass = custom_getpass
 
 
 
+def get_memory_store(name):
+    return memory.MemoryStore(
+        os.path.join(GLib.get_user_config_dir(), f"{name}_memory.db"),
+        os.path.join(GLib.get_user_config_dir(), f"{name}_memory.json")
+    )
+
+
 class ToolMemory(Tool):
     def __init__(self, name):
         super().__init__(name)
-        self.memory_file = os.path.join(GLib.get_user_config_dir(), f"{self.name}_memory.json")
-        if not os.path.exists(self.memory_file):
-            with open(self.memory_file, 'w') as file:
-                json.dump([], file)
+        self.store = get_memory_store(self.name)
 
     def get_dependencies(self):
-        return ["note_description"]
+        return ["note_description", "recall_limit", "recall_token_budget"]
 
     def get_widget(self, function_args) -> Adw.Bin:
-        return WidgetMemory(function_args.get("note", "None"), self.memory_file)
+        return WidgetMemory(function_args.get("note", "None"), self.store)
 
     def get_parameters(self):
         return {
@@ -510,14 +645,21 @@ class ToolMemory(Tool):
         return self.name
 
     def get_note(self):
-        with open(self.memory_file, 'r') as file:
-            return json.load(file)
+        return self.store.get_notes()
+
+    def recall(self, query):
+        settings = self.config.tools.get(self.name)
+        return self.store.search(
+            query,
+            limit=int(settings.get("recall_limit") or 10),
+            token_budget=int(settings.get("recall_token_budget") or 1000)
+        )
 
 
 class WidgetMemory(Widget):
-    def __init__(self, note, memory_file):
+    def __init__(self, note, store):
         self.note = note
-        self.memory_file = memory_file
+        self.store = store
 
         self.icon = "text-editor-symbolic"
         self.name = "Memory"
@@ -537,20 +679,86 @@ class WidgetMemory(Widget):
         self.details_box.append(scrolled_window)
 
     def run(self):
-        with open(self.memory_file, 'r') as file:
-            notes = json.load(file)
-        notes.append(self.note)
-        with open(self.memory_file, 'w') as file:
-            json.dump(notes, file)
+        self.store.add_note(self.note)
         self.output_buffer.set_text(str(self.note))
         self.set_progress(1)
         self.progress_bar.add_css_class("success")
 
 
+class ToolMemoryRecall(Tool):
+    def __init__(self, name):
+        super().__init__(name)
+        self.memory = self.config.tools.get(self.name).get("memory")
+        self.store = None
+        if (self.config.tools.get(self.memory) or {}).get("type") == "memory":
+            self.store = get_memory_store(self.memory)
+
+    def get_dependencies(self):
+        return ["query_description", "memory", "recall_limit", "recall_token_budget"]
+
+    def get_widget(self, function_args) -> Adw.Bin:
+        if self.store is None:
+            raise ValueError(f"{self.name}: memory setting {self.memory!r} does not name a memory tool")
+        settings = self.config.tools.get(self.name)
+        return WidgetMemoryRecall(
+            function_args.get("query", ""),
+            self.store,
+            int(settings.get("recall_limit") or 10),
+            int(settings.get("recall_token_budget") or 1000)
+        )
+
+    def get_parameters(self):
+        return {
+            "query": {
+                "type": "string",
+                "description": self.config.tools.get(self.name).get("query_description"),
+            },
+        }
+
+    def get_required(self):
+        return ["query"]
+
+    def get_name(self):
+        return self.name
+
+
+class WidgetMemoryRecall(Widget):
+    def __init__(self, query, store, limit, token_budget):
+        self.query = query
+        self.store = store
+        self.limit = limit
+        self.token_budget = token_budget
+
+        self.icon = "system-search-symbolic"
+        self.name = "Recall"
+
+        super().__init__()
+
+
+        self.output_view = Gtk.TextView()
+        self.output_view.set_editable(False)
+        self.output_view.set_wrap_mode(Gtk.WrapMode.WORD_CHAR)
+        self.output_view.set_css_classes(["monospace"])
+        self.output_buffer = self.output_view.get_buffer()
+
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_child(self.output_view)
+        scrolled_window.set_vexpand(True)
+        self.details_box.append(scrolled_window)
+
+    def run(self):
+        notes = self.store.search(self.query, self.limit, self.token_budget)
+        self.result = "\n".join(notes) if notes else "No matching notes."
+        GLib.idle_add(self.output_buffer.set_text, self.result)
+        GLib.idle_add(self.set_progress, 1)
+        GLib.idle_add(self.progress_bar.add_css_class, "success")
+
+
 class ToolURLTextExtractor(Tool):
 
     def get_dependencies(self):
-        return ["name_description", "url_description"]
+        return ["name_description", "url_description", "max_chars", "max_download_mb", "cache_minutes",
+                "max_host_connections"]
 
     def get_parameters(self):
         return {
@@ -567,10 +775,20 @@ class ToolURLTextExtractor(Tool):
     def get_required(self):
         return ["name", "url"]
 
+    def get_extract_limits(self):
+        settings = self.config.tools.get(self.name)
+        return {
+            "max_chars": int(settings.get("max_chars") or 20000),
+            "max_bytes": int(float(settings.get("max_download_mb") or 5) * 1024 * 1024),
+            "fresh_for": float(settings.get("cache_minutes") or 10) * 60,
+            "max_host_connections": int(settings.get("max_host_connections") or 4),
+        }
+
     def get_widget(self, function_args) -> Adw.Bin:
         return WidgetURLTextExtractor(
             function_args.get("name", "URL Text Extractor"),
-            function_args.get("url", "")
+            function_args.get("url", ""),
+            self.get_extract_limits(),
         )
 
     def get_name(self):
@@ -578,8 +796,9 @@ class ToolURLTextExtractor(Tool):
 
 
 class WidgetURLTextExtractor(Widget):
-    def __init__(self, name, url):
+    def __init__(self, name, url, limits=None):
         self.url = url
+        self.limits = limits or {}
         self.icon = "web-browser-symbolic"
         self.name = name
 
@@ -616,38 +835,25 @@ class WidgetURLTextExtractor(Widget):
         try:
             self.set_progress(0.1)
             self.update_output("Fetching URL...")
-            headers = {'User-Agent': UserAgent().random}
-            response = requests.get(self.url, headers=headers, timeout=10)
-            response.raise_for_status()
-            self.set_progress(0.3)
-            self.update_output("Parsing content...")
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                tag.decompose()
-
-            self.set_progress(0.5)
-            self.update_output("Extracting text...")
-            content = []
-            for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'a']):
-                text = element.get_text(strip=True)
-
-                if element.name == 'a' and element.has_attr('href'):
-                    link_url = urljoin(self.url, element['href'])
-                    content.append(f"{text} [{link_url}]")
-                else:
-                    content.append(text)
+            max_chars = self.limits.get("max_chars", 20000)
+            stream_buffer = managers.StreamBuffer(self.append_output, 100)
+            extracted = 0
 
-            self.set_progress(0.8)
-            self.update_output("Formatting result...")
-            self.result = '\n\n'.join(content)
-            self.result = re.sub(r'\n\s*\n', '\n\n', self.result)
-            self.result = re.sub(r'\s+', ' ', self.result)
+            def on_block(text):
+                nonlocal extracted
+                if not extracted:
+                    self.update_output("")
+                extracted += len(text)
+                stream_buffer.push(text + "\n\n")
+                self.set_progress(0.1 + 0.9 * min(extracted / max_chars, 1))
 
+            self.result = fetch_page(self.url, self.limits, on_block)["text"]
+            GLib.idle_add(stream_buffer.flush)
+
+            self.update_output(self.result)
             self.set_progress(1.0)
             self.url_entry.add_css_class("success")
             self.progress_bar.add_css_class("success")
-            self.update_output(self.result)
         except Exception as e:
             self.result = str(e)
             self.url_entry.add_css_class("error")
@@ -656,6 +862,9 @@ class WidgetURLTextExtractor(Widget):
 
         self.set_progress(1.0)
 
+    def append_output(self, text):
+        self.output_buffer.insert(self.output_buffer.get_end_iter(), text)
+
     def update_output(self, text):
         def do_update():
             self.output_buffer.set_text(text)
@@ -663,6 +872,148 @@ class WidgetURLTextExtractor(Widget):
         GLib.idle_add(do_update)
 
 
+class ToolURLCrawler(ToolURLTextExtractor):
+
+    def get_dependencies(self):
+        return ["name_description", "url_description", "depth_description", "pages_description",
+                "max_depth", "max_pages", "max_chars", "max_download_mb", "cache_minutes",
+                "max_host_connections", "requests_per_second"]
+
+    def get_parameters(self):
+        settings = self.config.tools.get(self.name)
+        return {
+            "name": {
+                "type": "string",
+                "description": settings.get("name_description"),
+            },
+            "url": {
+                "type": "string",
+                "description": settings.get("url_description"),
+            },
+            "depth": {
+                "type": "integer",
+                "description": settings.get("depth_description"),
+            },
+            "max_pages": {
+                "type": "integer",
+                "description": settings.get("pages_description"),
+            },
+        }
+
+    def get_required(self):
+        return ["name", "url"]
+
+    def get_extract_limits(self):
+        settings = self.config.tools.get(self.name)
+        limits = super().get_extract_limits()
+        limits["max_depth"] = int(settings.get("max_depth") or 2)
+        limits["max_pages"] = int(settings.get("max_pages") or 20)
+        limits["min_interval"] = 1 / float(settings.get("requests_per_second") or 4)
+        return limits
+
+    def get_widget(self, function_args) -> Adw.Bin:
+        limits = self.get_extract_limits()
+        depth = function_args.get("depth")
+        max_pages = function_args.get("max_pages")
+        return WidgetURLCrawler(
+            function_args.get("name", "URL Crawler"),
+            function_args.get("url", ""),
+            limits,
+            max(0, min(config.parse_number(depth, 1), limits["max_depth"])),
+            max(1, min(config.parse_number(max_pages, limits["max_pages"]), limits["max_pages"])),
+        )
+
+
+class WidgetURLCrawler(WidgetURLTextExtractor):
+    def __init__(self, name, url, limits, depth, max_pages):
+        self.depth = depth
+        self.max_pages = max_pages
+        self.stopped = threading.Event()
+        super().__init__(name, url, limits)
+        self.icon.set_from_icon_name("network-workgroup-symbolic")
+
+    def run(self):
+        try:
+            self.update_output("Crawling...")
+            self.result = self.crawl()
+            self.update_output(self.result)
+            self.url_entry.add_css_class("success")
+            self.progress_bar.add_css_class("success")
+        except Exception as e:
+            self.result = str(e)
+            self.url_entry.add_css_class("error")
+            self.progress_bar.add_css_class("error")
+            self.update_output(f"Error: {self.result}")
+
+        self.set_progress(1.0)
+
+    def crawl(self):
+        seed = extract.normalize_url(self.url)
+        if seed is None:
+            raise ValueError(f"Unsupported URL: {self.url}")
+        host = urlsplit(seed).netloc
+
+        seen = {seed}
+        hashes = set()
+        frontier = [seed]
+        pages = []
+        errors = []
+        fetched = 0
+        for depth in range(self.depth + 1):
+            batch = frontier[:self.max_pages - fetched]
+            if not batch or self.stopped.is_set():
+                break
+            fetched += len(batch)
+            futures = {fetch_executor.submit(fetch_page, url, self.limits): url for url in batch}
+            entries = {}
+            for future in as_completed(futures):
+                if self.stopped.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                url = futures[future]
+                try:
+                    entries[url] = future.result()
+                except Exception as e:
+                    errors.append(f"{url}: {e}")
+                self.set_progress((fetched - len(batch) + len(entries)) / self.max_pages)
+
+            frontier = []
+            for url in batch:
+                entry = entries.get(url)
+                if entry is None:
+                    continue
+                digest = hashlib.sha256(entry["text"].encode()).hexdigest()
+                if entry["text"] and digest not in hashes:
+                    hashes.add(digest)
+                    pages.append((url, entry["text"]))
+                if depth == self.depth:
+                    continue
+                for link in extract.extract_links(entry["html"], url):
+                    link = extract.normalize_url(link)
+                    if link and link not in seen and urlsplit(link).netloc == host:
+                        seen.add(link)
+                        frontier.append(link)
+            self.set_progress(fetched / self.max_pages)
+
+        return self.merge(pages, errors)
+
+    def merge(self, pages, errors):
+        budget = self.limits.get("max_chars", 20000)
+        parts = []
+        for url, text in pages:
+            part = f"Source: {url}\n{text}"[:budget]
+            parts.append(part)
+            budget -= len(part) + 2
+            if budget <= 0:
+                break
+        if errors:
+            parts.append("Failed:\n" + "\n".join(errors))
+        return "\n\n".join(parts) or "No text found"
+
+    def stop(self):
+        self.stopped.set()
+
 
 class ToolRunBasicChat(Tool):
 
@@ -700,10 +1051,12 @@ class WidgetRunSimpleChat(Widget):
 
         self.message = message
         self.chat_name = chat
+        self.chat = None
+        self.stopped = False
         self.icon = "user-available-symbolic"
         self.name = name
 
-        self.config = config.ConfigManager()
+        self.config = config.get_config_manager()
 
         super().__init__()
 
@@ -732,18 +1085,37 @@ class WidgetRunSimpleChat(Widget):
         clipboard.set(self.message)
 
     def run(self):
+        self.start_chat()
+        if self.chat is not None:
+            self.chat.done.wait()
+            self.finish_chat()
+
+    async def run_async(self):
+        await engine.run_on_main(self.start_chat)
+        if self.chat is not None:
+            await self.chat.wait_done()
+            await engine.run_on_main(self.finish_chat)
+
+    def start_chat(self):
+        if self.stopped:
+            return
         self.chat = managers.chatManagers.get(self.config.chats.get(self.chat_name)["type"])(self.chat_name)
         widget = self.chat.send_message(self.message)
         self.output_view.append(widget)
-        while self.chat.result == None:
-            continue
 
+    def finish_chat(self):
         self.result = self.chat.get_result() if self.chat.get_result() else ""
+        self.chat.close()
         self.set_progress(1)
 
     def stop(self):
+        self.stopped = True
+        if self.chat is None:
+            return
         self.chat.result = ""
         self.chat.execution_control.stop_all()
+        self.chat.set_done()
+        GLib.idle_add(self.chat.close)
 
 
 
@@ -760,12 +1132,69 @@ class MarkdownView(Gtk.Box):
         self.set_margin_top(12)
         self.set_margin_bottom(12)
 
+        self._text = ""
+        self._blocks = []
+        self._open_start = 0
+
         if text:
             self.set_markdown(text)
 
 
     def set_markdown(self, text: str):
-        self._clear_content()
+        if self._blocks and text.startswith(self._text):
+            self._remove_block(self._blocks.pop())
+        else:
+            self._clear_content()
+            self._blocks = []
+            self._open_start = 0
+
+        self._text = text
+        blocks = self._split_blocks(text, self._open_start)
+        for start, end in blocks:
+            self._blocks.append(self._render_block(text[start:end]))
+        self._open_start = blocks[-1][0]
+
+    def append_markdown(self, text: str):
+        self.set_markdown(self._text + text)
+
+    def _split_blocks(self, text: str, start: int):
+        blocks = []
+        block_start = start
+        block_is_list = self._is_list_line(text, start)
+        fence = None
+        blank = False
+        pos = start
+
+        while pos < len(text):
+            end = text.find("\n", pos)
+            if end == -1:
+                break
+            line = text[pos:end]
+            stripped = line.strip()
+
+            if fence:
+                if stripped.startswith(fence):
+                    fence = None
+            elif not stripped:
+                blank = True
+            else:
+                if blank and not line[0].isspace() and not (block_is_list and self._is_list_line(text, pos)):
+                    blocks.append((block_start, pos))
+                    block_start = pos
+                    block_is_list = self._is_list_line(text, pos)
+                blank = False
+                if stripped.startswith("```") or stripped.startswith("~~~"):
+                    fence = stripped[:3]
+            pos = end + 1
+
+        blocks.append((block_start, len(text)))
+        return blocks
+
+    def _is_list_line(self, text: str, pos: int) -> bool:
+        return bool(re.match(r"[ \t]*(?:[*+-]|\d+\.)[ \t]", text[pos:pos + 32]))
+
+    def _render_block(self, source: str):
+        last = self.get_last_child()
 
         extensions = [
             'tables',
@@ -773,13 +1202,24 @@ class MarkdownView(Gtk.Box):
             'def_list'
         ]
 
-        html = markdown.markdown(text, extensions=extensions)
+        html = markdown.markdown(source, extensions=extensions)
         soup = BeautifulSoup(html, 'html.parser')
 
         for element in soup.children:
             if element.name:
                 self._process_element(element)
 
+        widgets = []
+        child = last.get_next_sibling() if last else self.get_first_child()
+        while child:
+            widgets.append(child)
+            child = child.get_next_sibling()
+        return widgets
+
+    def _remove_block(self, widgets):
+        for widget in widgets:
+            self.remove(widget)
+
     def _clear_content(self):
         while child := self.get_first_child():
             self.remove(child)
@@ -929,45 +1369,24 @@ class MarkdownView(Gtk.Box):
             self.append(separator)
 
     def _add_image(self, src: str, alt: str):
-        try:
-            if src.startswith("http://") or src.startswith("https://"):
-                response = requests.get(src, stream=True)
-                response.raise_for_status()
-                input_stream = Gio.MemoryInputStream.new_from_data(response.content)
-                pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(
-                    input_stream,
-                    width=330,
-                    height=-1,
-                    preserve_aspect_ratio=True,
-                    cancellable=None
-                )
-            else:
-                path = Path(src)
-                if path.exists():
-                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                        str(path),
-                        width=330,
-                        height=-1,
-                        preserve_aspect_ratio=True
-                    )
-                else:
-                    pixbuf = None
-            if pixbuf:
-                picture = Gtk.Picture()
+        picture = Gtk.Picture()
+        picture.set_halign(Gtk.Align.START)
+        picture.set_can_shrink(True)
+        picture.set_keep_aspect_ratio(True)
 
-                picture.set_pixbuf(pixbuf)
-                picture.set_halign(Gtk.Align.START)
-                picture.set_can_shrink(True)
-                picture.set_keep_aspect_ratio(True)
+        picture.set_size_request(330, 330)
 
-                picture.set_size_request(330, 330)
+        if alt:
+            picture.set_tooltip_text(alt)
 
-                if alt:
-                    picture.set_tooltip_text(alt)
+        def on_loaded(texture):
+            if texture is None:
+                picture.set_visible(False)
+            else:
+                picture.set_paintable(texture)
 
-                self.append(picture)
-        except (GLib.Error, requests.RequestException) as e:
-            print(f"Error: {src}: {e}")
+        if images.get_loader().load(src, on_loaded):
+            self.append(picture)
 
     def _add_list(self, element, level: int = 0):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
@@ -1160,6 +1579,8 @@ tools = {
     "python": ToolPython,
     "thinking": ToolThinking,
     "memory": ToolMemory,
+    "memoryRecall": ToolMemoryRecall,
     "urlTextExtractor": ToolURLTextExtractor,
+    "urlCrawler": ToolURLCrawler,
     "runSimpleChat": ToolRunBasicChat,
 }
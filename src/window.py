@@ -34,7 +34,7 @@ class WienereWindow(Adw.ApplicationWindow):
         self.files = []
         self.is_recording = False
         self.chat = None
-        self.config = config.ConfigManager()
+        self.config = config.get_config_manager()
 
 
         self.chat_list = self.chat_selector.get_model()
@@ -44,19 +44,23 @@ class WienereWindow(Adw.ApplicationWindow):
         for chat in self.chats:
             self.add_chat(chat)
 
+        self.config.connect("changed", self.on_config_changed)
+
     def update_config(self):
-        configManager = config.ConfigManager()
-
-        if self.chats != list(configManager.chats):
-            self.config = None
-            while self.chat_list:
-                self.chat_list.remove(0)
-            self.config = configManager
-            self.chats = list(self.config.chats)
-            for chat in self.chats:
+        for chat in [chat for chat in self.chats if chat not in self.config.chats]:
+            self.remove_chat(chat)
+        for chat in self.config.chats:
+            if chat not in self.chats:
                 self.add_chat(chat)
-        else:
-            self.config = configManager
+
+    def on_config_changed(self, manager, category, name):
+        if category != "chats":
+            return
+        if name in self.config.chats and name not in self.chats:
+            self.add_chat(name)
+        elif name not in self.config.chats and name in self.chats:
+            self.remove_chat(name)
+
     def on_key_pressed(self, controller, keyval, keycode, state):
         if state & Gdk.ModifierType.ALT_MASK:
             if keyval == Gdk.KEY_Up:
@@ -96,8 +100,15 @@ class WienereWindow(Adw.ApplicationWindow):
         self.add_controller(key_controller)
 
     def add_chat(self, chat_name):
+        if chat_name not in self.chats:
+            self.chats.append(chat_name)
         self.chat_list.append(chat_name)
 
+    def remove_chat(self, chat_name):
+        index = self.chats.index(chat_name)
+        self.chats.pop(index)
+        self.chat_list.remove(index)
+
     def on_chat_changed(self, dropdown, pspec):
         self.clear_chat_history()
 
@@ -110,6 +121,8 @@ class WienereWindow(Adw.ApplicationWindow):
         if selected and self.config:
             chat_name = self.chat_selector.get_selected_item().get_string()
             self.stop_current_execution()
+            if self.chat:
+                self.chat.close()
             self.chat = managers.chatManagers.get(self.config.chats.get(chat_name)["type"])(chat_name)
             if type(self.chat) != managers.VisionChatManager:
                 while self.images:
@@ -0,0 +1,22 @@
+from src import extract
+
+
+def test_paragraph_closed_by_list_keeps_list_items_separate():
+    html = '<p>Second<ul><li>one<li>two</ul><div>junk</div><a href="/s">S</a><p>x'
+    text = extract.extract_html(html, "http://example.com/")
+    assert text == "Second\n\none\n\ntwo\n\nS [http://example.com/s]\n\nx"
+
+
+def test_paragraph_closed_inside_inline_element():
+    html = "<div><p>a <b>b<p>c</div><p>d<table><tr><td>cell</table>"
+    assert extract.extract_html(html, "http://example.com/") == "a b\n\nc\n\nd"
+
+
+def test_skipped_sections_are_ignored():
+    html = "<nav><a href='/n'>nav</a></nav><h1>Title</h1><script>var a</script><footer><p>foot</footer>"
+    assert extract.extract_html(html, "http://example.com/") == "Title"
+
+
+def test_stops_at_character_budget():
+    html = "".join(f"<p>paragraph {index}</p>" for index in range(1000))
+    assert len(extract.extract_html(html, "http://example.com/", max_chars=100)) <= 100